@@ -1,4 +1,7 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 import os
 import sys
 from werkzeug.utils import secure_filename
@@ -6,8 +9,21 @@ from werkzeug.utils import secure_filename
 # Add the parent directory to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.resume_parser import ResumeParser
-from utils.matcher import ResumeMatcher
+from utils.matcher import project_results, requirements_cache, results_cache, shared_matcher
+from utils.resume_parser import document_size, response_fields
+from utils.profiles import resolve_profile
+from utils.score_store import score_store
+from utils.ingest import parse_streams, parse_texts
+from utils.cache import parse_cache
+from utils.corpus_index import corpus_index
+from utils.jobs import job_queue
+from utils.extractors import extractor_stats
+from utils.resources import record_startup, startup_report
+from utils import metrics
+from utils.admission import Overloaded, admission, estimate_cost, estimate_pdf_pages
+from utils.dedup import DEDUP_DEFAULT, attach_duplicates, collapse_duplicates, find_duplicates
+from utils.export import EXPORT_FORMATS, export_columns, export_format, iter_export
+from utils.streaming import NDJSON_MIMETYPE, iter_analysis_records, iter_ndjson, wants_stream
 
 # Initialize Flask app
 app = Flask(__name__, 
@@ -24,10 +40,162 @@ ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Time from the first import of this module until the app is ready to serve
+record_startup('app_import', time.perf_counter() - _IMPORT_STARTED)
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def parse_uploads(files):
+    """Parse uploads straight from their streams; returns per-file results"""
+    uploads = []
+    invalid_files = []
+    for file in files:
+        if file and allowed_file(file.filename):
+            uploads.append((secure_filename(file.filename), file.stream))
+        else:
+            invalid_files.append((file.filename, None, 'Invalid file type'))
+    
+    # Only uploads above INGEST_SPILL_BYTES are written (uniquely named) to UPLOAD_FOLDER
+    return invalid_files + parse_streams(uploads, app.config['UPLOAD_FOLDER'])
+
+# Resume fields shown on the results page
+RESULTS_PAGE_FIELDS = ('email', 'phone', 'experience_years', 'raw_text')
+
+def get_top_k(data, default=None):
+    """Read the optional top_k (or limit) field; raises ValueError when invalid"""
+    top_k = data.get('top_k', data.get('limit'))
+    if top_k is None:
+        return default
+    try:
+        top_k = int(top_k)
+    except (TypeError, ValueError):
+        raise ValueError('top_k must be a positive integer')
+    if top_k < 1:
+        raise ValueError('top_k must be a positive integer')
+    return top_k
+
+def export_response(matches, columns, fmt, headers=None):
+    """Stream ranked matches as a CSV or NDJSON download"""
+    headers = dict(headers or {})
+    headers['Content-Disposition'] = f'attachment; filename=resume_analysis_results.{fmt}'
+    return Response(iter_export(matches, columns, fmt), mimetype=EXPORT_FORMATS[fmt], headers=headers)
+
+def get_matcher(data):
+    """Matcher for the request's scoring profile (body or X-Scoring-Profile header); raises ValueError"""
+    return shared_matcher(**resolve_profile(data, request.headers.get('X-Scoring-Profile')))
+
+def get_flag(data, name, default=False):
+    """Read an optional boolean flag (body or query string)"""
+    value = data.get(name, request.args.get(name))
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+def wants_dedupe(data):
+    """Read the optional dedupe flag, defaulting to DEDUP_DEFAULT"""
+    return get_flag(data, 'dedupe', DEDUP_DEFAULT)
+
+def parse_resume_texts(resumes_text, dedupe=False):
+    """Parse texts named Resume_1..N (once per near-duplicate cluster with dedupe); returns (resume_data, errors, duplicates)"""
+    clusters = [[i] for i in range(len(resumes_text))]
+    if dedupe:
+        # Only texts are compared; anything else is parsed (and fails) on its own
+        texts = [i for i, text in enumerate(resumes_text) if isinstance(text, str)]
+        clusters = [[texts[j] for j in cluster] for cluster in find_duplicates([resumes_text[i] for i in texts])]
+        clusters += [[i] for i, text in enumerate(resumes_text) if not isinstance(text, str)]
+        clusters.sort()
+    
+    resume_data = []
+    errors = []
+    duplicates = {}
+    representatives = [resumes_text[cluster[0]] for cluster in clusters]
+    for cluster, (parsed_data, error) in zip(clusters, parse_texts(representatives)):
+        filenames = [f'Resume_{i+1}' for i in cluster]
+        if error:
+            errors.extend({'filename': filename, 'error': error} for filename in filenames)
+            continue
+        parsed_data['filename'] = filenames[0]
+        resume_data.append(parsed_data)
+        if len(filenames) > 1:
+            duplicates[filenames[0]] = filenames[1:]
+    return resume_data, errors, duplicates
+
+def get_resume_fields(data):
+    """Read the optional fields / include_raw_text options (body or query string); raises ValueError when invalid"""
+    fields = data.get('fields', request.args.get('fields'))
+    include_raw_text = data.get('include_raw_text', request.args.get('include_raw_text'))
+    if isinstance(include_raw_text, str):
+        include_raw_text = include_raw_text.lower() in ('1', 'true', 'yes')
+    return response_fields(fields, include_raw_text)
+
+_first_request_pending = True
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started and collect its stage timings"""
+    request.environ['resume.started'] = time.perf_counter()
+    if metrics.METRICS_ENABLED:
+        request.environ['resume.metrics'] = metrics.start_collecting()
+
+@app.after_request
+def record_request_metrics(response):
+    """Add the Server-Timing header and record the request in /metrics"""
+    started = request.environ.get('resume.started')
+    collecting = request.environ.pop('resume.metrics', None)
+    if collecting is None or started is None:
+        return response
+    timings = metrics.stop_collecting(collecting[1])
+    elapsed = time.perf_counter() - started
+    # Streamed responses are still being produced; their stages go straight to /metrics
+    if not response.is_streamed:
+        response.headers['Server-Timing'] = timings.server_timing(elapsed)
+    metrics.observe_request(request.method, request.endpoint or 'unknown', response.status_code, elapsed)
+    return response
+
+@app.after_request
+def record_first_request(response):
+    """Record the first request's latency, which includes lazy imports and loads"""
+    global _first_request_pending
+    started = request.environ.get('resume.started')
+    if _first_request_pending and started is not None:
+        _first_request_pending = False
+        record_startup('first_request', time.perf_counter() - started)
+    return response
+
+# Endpoints whose parse/match work goes through admission control
+ADMITTED_ENDPOINTS = frozenset(['upload_files', 'api_analyze', 'api_analyze_matrix', 'api_export',
+                                'api_corpus_add'])
+
+def estimate_request_cost():
+    """Admission cost of the current request from its resume count, bytes and estimated PDF pages"""
+    if request.files:
+        sizes = [(file.filename or '', document_size(file.stream)) for file in request.files.getlist('resumes')]
+        pages = sum(estimate_pdf_pages(size) for filename, size in sizes if filename.lower().endswith('.pdf'))
+        return estimate_cost(len(sizes), sum(size for filename, size in sizes), pages)
+    
+    data = request.get_json(silent=True) or {}
+    resumes = data.get('resumes') if isinstance(data, dict) else None
+    if not isinstance(resumes, list):
+        return estimate_cost(0)
+    return estimate_cost(len(resumes), sum(len(text) for text in resumes if isinstance(text, str)))
+
+@app.before_request
+def admit_request():
+    """Queue expensive requests for admission; raises Overloaded when the server is at capacity"""
+    if request.endpoint in ADMITTED_ENDPOINTS:
+        request.environ['resume.admission'] = admission.acquire(estimate_request_cost())
+
+@app.teardown_request
+def release_admission(exc):
+    """Release the request's admission ticket (after a streamed response has finished)"""
+    ticket = request.environ.pop('resume.admission', None)
+    if ticket is not None:
+        ticket.release()
+
 @app.route('/')
 def index():
     """Main page - upload form"""
@@ -53,40 +221,34 @@ def upload_files():
             flash('No files selected', 'error')
             return redirect(url_for('index'))
 
-        # Process uploaded files
+        # Parse uploads in the worker pool
         resume_data = []
-        parser = ResumeParser()
-        
-        for file in files:
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                
-                try:
-                    # Parse resume
-                    parsed_data = parser.parse_resume(filepath)
-                    parsed_data['filename'] = filename
-                    resume_data.append(parsed_data)
-                    
-                    # Clean up uploaded file
-                    os.remove(filepath)
-                    
-                except Exception as e:
-                    flash(f'Error processing {filename}: {str(e)}', 'error')
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
-            else:
-                flash(f'Invalid file type for {file.filename}', 'error')
+        for filename, parsed_data, error in parse_uploads(files):
+            if error:
+                flash(f'Error processing {filename}: {error}', 'error')
+                continue
+            parsed_data['filename'] = filename
+            resume_data.append(parsed_data)
 
         if not resume_data:
             flash('No valid resumes could be processed', 'error')
             return redirect(url_for('index'))
 
+        # With dedupe, near-duplicate uploads (e.g. PDF and DOCX twins) are scored once
+        duplicates = {}
+        if wants_dedupe(request.form):
+            resume_data, duplicates = collapse_duplicates(resume_data)
+
         # Match resumes with job description
-        matcher = ResumeMatcher()
+        matcher = get_matcher(request.form)
         results = matcher.match_resumes(resume_data, job_description)
         
+        # The page shows contact fields and the first 1000 characters of each
+        # resume (one more is kept so it can tell when to add '...')
+        results = project_results(results, RESULTS_PAGE_FIELDS, text_limit=1001)
+        if duplicates:
+            results['matches'] = attach_duplicates(results['matches'], duplicates)
+        
         return render_template('results.html', results=results, job_description=job_description)
 
     except Exception as e:
@@ -101,28 +263,344 @@ def api_analyze():
         
         if not data or 'job_description' not in data or 'resumes' not in data:
             return jsonify({'error': 'Invalid request data'}), 400
+        if not isinstance(data['job_description'], str):
+            return jsonify({'error': 'job_description must be a string'}), 400
             
         job_description = data['job_description']
         resumes_text = data['resumes']  # List of resume texts
         
-        # Create resume data structure
-        resume_data = []
-        parser = ResumeParser()
+        # Optional cut-off: only the best top_k (or limit) matches are built and returned
+        # Matches carry only the requested resume fields (no raw text by default)
+        try:
+            top_k = get_top_k(data)
+            fields = get_resume_fields(data)
+            matcher = get_matcher(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        for i, resume_text in enumerate(resumes_text):
-            parsed_data = parser.parse_text(resume_text)
-            parsed_data['filename'] = f'Resume_{i+1}'
-            resume_data.append(parsed_data)
+        # Streaming mode: one NDJSON record per resume, then the global ranking
+        if wants_stream(request, data):
+            records = iter_analysis_records(resumes_text, job_description, matcher, top_k, fields)
+            return Response(stream_with_context(iter_ndjson(records)), mimetype=NDJSON_MIMETYPE)
         
-        # Match resumes
-        matcher = ResumeMatcher()
-        results = matcher.match_resumes(resume_data, job_description)
+        # Create resume data structure (large batches are parsed in the worker pool);
+        # with dedupe, near-duplicates are listed on their cluster's first resume
+        resume_data, errors, duplicates = parse_resume_texts(resumes_text, wants_dedupe(data))
+        
+        # Match resumes; with rerankable, component scores are kept under a result_id
+        results = matcher.match_resumes(resume_data, job_description, top_k=top_k,
+                                        keep_scores=get_flag(data, 'rerankable'))
+        results = project_results(results, fields)
+        if duplicates:
+            results['matches'] = attach_duplicates(results['matches'], duplicates)
+            results['duplicates_removed'] = sum(map(len, duplicates.values()))
+        if errors:
+            results['errors'] = errors
+        
+        return jsonify(results)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analyze/matrix', methods=['POST'])
+def api_analyze_matrix():
+    """Score resumes against several job descriptions: N x M scores, top-k per job, best jobs per resume"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'resumes' not in data or not isinstance(data.get('job_descriptions'), list):
+            return jsonify({'error': 'Invalid request data'}), 400
+        job_descriptions = [str(job_description) for job_description in data['job_descriptions']]
+        if not job_descriptions:
+            return jsonify({'error': 'Please provide at least one job description'}), 400
+        
+        try:
+            top_k = get_top_k(data)
+            fields = get_resume_fields(data)
+            matcher = get_matcher(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Each resume is parsed once for every job description
+        resume_data, errors, duplicates = parse_resume_texts(data['resumes'], wants_dedupe(data))
+        
+        results = matcher.match_matrix(resume_data, job_descriptions, top_k=top_k)
+        results['jobs'] = [project_results(job, fields) for job in results['jobs']]
+        if duplicates:
+            for job in results['jobs']:
+                job['matches'] = attach_duplicates(job['matches'], duplicates)
+            results['best_fit'] = attach_duplicates(results['best_fit'], duplicates)
+            results['duplicates_removed'] = sum(map(len, duplicates.values()))
+        if errors:
+            results['errors'] = errors
         
         return jsonify(results)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/results/<result_id>/rerank', methods=['POST'])
+def api_rerank(result_id):
+    """Re-rank a stored result with other weights or min_score, without re-parsing or re-scoring"""
+    data = request.get_json(silent=True) or {}
+    try:
+        top_k = get_top_k(data)
+        matcher = get_matcher(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    stored = score_store.get(result_id)
+    if stored is None:
+        return jsonify({'error': 'Result not found or expired'}), 404
+    filenames, components = stored
+    
+    try:
+        ranking = matcher.rerank(filenames, components, top_k)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'result_id': result_id,
+        'weights': matcher.weights,
+        'min_score': matcher.min_score,
+        'ranking': ranking,
+        'total_resumes': len(filenames)
+    })
+
+@app.route('/api/export', methods=['POST'])
+def api_export():
+    """Analyze resumes like /api/analyze and stream the ranked matches as CSV or NDJSON"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'job_description' not in data or 'resumes' not in data:
+            return jsonify({'error': 'Invalid request data'}), 400
+        if not isinstance(data['job_description'], str):
+            return jsonify({'error': 'job_description must be a string'}), 400
+        
+        try:
+            top_k = get_top_k(data)
+            columns = export_columns(data.get('columns', request.args.get('columns')))
+            fmt = export_format(request, data)
+            matcher = get_matcher(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        resume_data, errors, duplicates = parse_resume_texts(data['resumes'], wants_dedupe(data))
+        
+        # Identical requests are served from the result cache
+        results = matcher.match_resumes(resume_data, data['job_description'], top_k=top_k)
+        matches = attach_duplicates(results['matches'], duplicates)
+        return export_response(matches, columns, fmt, {'X-Resume-Errors': str(len(errors))})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/corpus', methods=['POST'])
+def api_corpus_add():
+    """Parse resumes (JSON texts or uploaded files) and add them to the corpus index"""
+    try:
+        added = []
+        errors = []
+        
+        if request.files:
+            results = parse_uploads(request.files.getlist('resumes'))
+        else:
+            data = request.get_json(silent=True)
+            if not data or 'resumes' not in data:
+                return jsonify({'error': 'Invalid request data'}), 400
+            resumes_text = data['resumes']
+            filenames = data.get('filenames') or [f'Resume_{i+1}' for i in range(len(resumes_text))]
+            if len(filenames) != len(resumes_text):
+                return jsonify({'error': 'filenames must have one entry per resume'}), 400
+            results = [(filename, parsed_data, error) for filename, (parsed_data, error)
+                       in zip(filenames, parse_texts(resumes_text))]
+        
+        for filename, parsed_data, error in results:
+            if error:
+                errors.append({'filename': filename, 'error': error})
+                continue
+            parsed_data['filename'] = filename
+            added.append({'filename': filename, 'resume_id': corpus_index.add(parsed_data)})
+        
+        return jsonify({'added': added, 'errors': errors})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/corpus', methods=['GET'])
+def api_corpus_stats():
+    """Corpus index statistics"""
+    return jsonify(corpus_index.stats())
+
+@app.route('/api/corpus/<int:resume_id>', methods=['DELETE'])
+def api_corpus_delete(resume_id):
+    """Remove a resume from the corpus index"""
+    if not corpus_index.delete(resume_id):
+        return jsonify({'error': 'Resume not found'}), 404
+    return jsonify({'deleted': resume_id})
+
+@app.route('/api/search', methods=['POST'])
+def api_search():
+    """Top-k candidates from the corpus index for a job description"""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('job_description'):
+            return jsonify({'error': 'Invalid request data'}), 400
+        if not isinstance(data['job_description'], str):
+            return jsonify({'error': 'job_description must be a string'}), 400
+        
+        try:
+            top_k = get_top_k(data, default=10)
+            fields = get_resume_fields(data)
+            matcher = get_matcher(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        results = corpus_index.search(data['job_description'], top_k=top_k, matcher=matcher)
+        return jsonify(project_results(results, fields))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def api_jobs_submit():
+    """Queue an analysis (JSON texts or uploaded files) for background processing"""
+    try:
+        if request.files:
+            data = request.form
+            files = []
+            for file in request.files.getlist('resumes'):
+                if file and allowed_file(file.filename):
+                    files.append((secure_filename(file.filename), file))
+            if not files:
+                return jsonify({'error': 'No valid resume files uploaded'}), 400
+        else:
+            data = request.get_json(silent=True)
+            if not data or 'resumes' not in data:
+                return jsonify({'error': 'Invalid request data'}), 400
+        
+        job_description = data.get('job_description') or ''
+        if not isinstance(job_description, str):
+            return jsonify({'error': 'job_description must be a string'}), 400
+        job_description = job_description.strip()
+        if not job_description:
+            return jsonify({'error': 'Please provide a job description'}), 400
+        
+        try:
+            top_k = get_top_k(data)
+            fields = list(get_resume_fields(data))
+            scoring = resolve_profile(data, request.headers.get('X-Scoring-Profile'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        options = {'top_k': top_k, 'fields': fields, 'scoring': scoring, 'dedupe': wants_dedupe(data),
+                   'rerankable': get_flag(data, 'rerankable')}
+        if request.files:
+            job_id = job_queue.submit_files(job_description, files, **options)
+        else:
+            job_id = job_queue.submit_texts(job_description, data['resumes'], **options)
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('api_jobs_status', job_id=job_id),
+            'result_url': url_for('api_jobs_result', job_id=job_id)
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_jobs_status(job_id):
+    """Status and progress of a queued job"""
+    job_queue.start()
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def api_jobs_result(job_id):
+    """Results of a finished job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] in ('queued', 'running'):
+        return jsonify(job), 202
+    if job['status'] != 'done':
+        return jsonify(job), 409
+    return jsonify(job_queue.result(job_id))
+
+@app.route('/api/jobs/<job_id>/export', methods=['GET'])
+def api_jobs_export(job_id):
+    """Stream a finished job's ranked matches as CSV or NDJSON"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] in ('queued', 'running'):
+        return jsonify(job), 202
+    if job['status'] != 'done':
+        return jsonify(job), 409
+    
+    # Resume columns are limited to the fields stored with the job (see fields=)
+    try:
+        columns = export_columns(request.args.get('columns'))
+        fmt = export_format(request, {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    results = job_queue.result(job_id)
+    return export_response(results['matches'], columns, fmt,
+                           {'X-Resume-Errors': str(len(results.get('errors', [])))})
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def api_jobs_cancel(job_id):
+    """Cancel a queued or running job"""
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job_queue.cancel(job_id):
+        return jsonify({'error': 'Job already finished'}), 409
+    return jsonify(job_queue.get(job_id))
+
+@app.route('/api/extractors', methods=['GET'])
+def api_extractors():
+    """PDF extraction backends and their timings in this process"""
+    return jsonify(extractor_stats())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Latency histograms and counters in the Prometheus text format"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admission', methods=['GET'])
+def api_admission():
+    """Admission limits, current load and rejection counts for this process"""
+    return jsonify(admission.stats())
+
+@app.route('/api/startup', methods=['GET'])
+def api_startup():
+    """Cold-start timings and which heavy libraries are loaded in this process"""
+    return jsonify(startup_report())
+
+@app.route('/api/cache/stats', methods=['GET'])
+def api_cache_stats():
+    """Cache counters, for sizing the caches"""
+    return jsonify({
+        'parse': parse_cache.stats(),
+        'requirements': requirements_cache.stats(),
+        'results': results_cache.stats()
+    })
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    """429 (queue full) or 503 (queue timeout) with a Retry-After hint"""
+    headers = {'Retry-After': str(e.retry_after)}
+    if request.path.startswith('/api/'):
+        return jsonify({'error': str(e), 'retry_after': e.retry_after}), e.status, headers
+    flash(f'{e} Please try again in {e.retry_after}s.', 'error')
+    return render_template('index.html'), e.status, headers
+
 @app.errorhandler(413)
 def too_large(e):
     flash('File is too large. Maximum size is 16MB.', 'error')
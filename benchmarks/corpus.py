@@ -0,0 +1,207 @@
+import io
+import os
+import random
+import sys
+
+# Vocabulary for synthetic documents; kept here rather than read from the skill
+# taxonomy so the corpus stays identical when the taxonomy changes
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Avery',
+               'Jamie', 'Quinn', 'Drew', 'Robin', 'Kai', 'Noor', 'Priya', 'Wei']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Patel', 'Kim', 'Nguyen', 'Okafor', 'Silva',
+              'Novak', 'Haddad', 'Larsen', 'Moreau', 'Rossi', 'Tanaka', 'Singh', 'Brown']
+TITLES = ['Software Engineer', 'Backend Developer', 'Data Scientist', 'DevOps Engineer',
+          'Frontend Developer', 'Full Stack Developer', 'Machine Learning Engineer',
+          'Data Engineer', 'Site Reliability Engineer', 'Mobile Developer']
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella Labs', 'Stark Industries',
+             'Wayne Enterprises', 'Hooli', 'Pied Piper', 'Vandelay Industries', 'Soylent']
+SKILLS = ['Python', 'Java', 'JavaScript', 'TypeScript', 'C++', 'C#', 'Go', 'Rust', 'SQL',
+          'React', 'Angular', 'Vue', 'Django', 'Flask', 'Spring', 'Express', 'Node.js',
+          'MySQL', 'PostgreSQL', 'MongoDB', 'Redis', 'Elasticsearch', 'AWS', 'Azure', 'GCP',
+          'Docker', 'Kubernetes', 'Terraform', 'Jenkins', 'Git', 'Jira', 'Machine Learning',
+          'Data Science', 'TensorFlow', 'PyTorch', 'Pandas', 'NumPy', 'scikit-learn']
+VERBS = ['Built', 'Designed', 'Led', 'Maintained', 'Migrated', 'Automated', 'Optimized',
+         'Delivered', 'Refactored', 'Scaled', 'Shipped', 'Mentored']
+OBJECTS = ['a payments platform', 'the data pipeline', 'customer-facing dashboards',
+           'an e-commerce backend', 'internal developer tools', 'the model serving layer',
+           'a real-time analytics service', 'the mobile API', 'CI/CD pipelines',
+           'the search infrastructure', 'a recommendation engine', 'monitoring and alerting']
+OUTCOMES = ['reducing latency by {n}%', 'cutting infrastructure cost by {n}%',
+            'serving {n}k daily users', 'improving test coverage to {n}%',
+            'reducing release time by {n}%', 'handling {n}M events per day']
+DEGREES = ['Bachelor of Science in Computer Science', 'Master of Science in Data Science',
+           'B.Tech in Information Technology', 'MBA, Technology Management',
+           'PhD in Machine Learning', 'Bachelor of Engineering in Electronics']
+UNIVERSITIES = ['State University', 'Institute of Technology', 'City College',
+                'National University', 'Polytechnic University']
+FILLER = ['collaborated', 'with', 'cross-functional', 'teams', 'to', 'deliver', 'reliable',
+          'features', 'on', 'schedule', 'and', 'improve', 'the', 'quality', 'of', 'our',
+          'codebase', 'through', 'reviews', 'documentation', 'testing', 'stakeholders']
+
+FORMATS = ('txt', 'docx', 'pdf')
+
+
+def _rng(kind, index, seed):
+    """Independent, reproducible random stream per document"""
+    return random.Random(f'{kind}:{seed}:{index}')
+
+
+def generate_resume(index, words=400, seed=0):
+    """Deterministic synthetic resume text of roughly the given number of words"""
+    rng = _rng('resume', index, seed)
+    name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+    skills = rng.sample(SKILLS, rng.randint(5, 12))
+    years = rng.randint(0, 20)
+
+    lines = [
+        name,
+        rng.choice(TITLES),
+        f'Email: {name.lower().replace(" ", ".")}{index}@example.com',
+        f'Phone: ({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}',
+        '',
+        'SUMMARY',
+        f'{rng.choice(TITLES)} with {years}+ years of experience in {", ".join(skills[:3])}.',
+        '',
+        'EXPERIENCE'
+    ]
+
+    count = sum(len(line.split()) for line in lines)
+    # Leave room for the education and skills sections
+    while count < words - 30:
+        job = f'{rng.choice(TITLES)}, {rng.choice(COMPANIES)} ({rng.randint(2000, 2020)} - {rng.randint(2021, 2025)})'
+        lines.append(job)
+        count += len(job.split())
+        for _ in range(rng.randint(2, 5)):
+            bullet = (f'- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)} '
+                      f'and {rng.choice(skills)}, '
+                      f'{rng.choice(OUTCOMES).format(n=rng.randint(5, 90))}; '
+                      f'{" ".join(rng.choice(FILLER) for _ in range(rng.randint(4, 16)))}.')
+            lines.append(bullet)
+            count += len(bullet.split())
+        lines.append('')
+
+    lines += [
+        'EDUCATION',
+        f'{rng.choice(DEGREES)}, {rng.choice(UNIVERSITIES)}, {rng.randint(1995, 2020)}',
+        '',
+        'SKILLS',
+        ', '.join(skills)
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def generate_job_description(index=0, seed=0):
+    """Deterministic synthetic job description"""
+    rng = _rng('job', index, seed)
+    title = rng.choice(TITLES)
+    skills = rng.sample(SKILLS, rng.randint(4, 8))
+    lines = [
+        f'{title} at {rng.choice(COMPANIES)}',
+        '',
+        f'We are looking for a {title.lower()} with {rng.randint(1, 10)}+ years of experience '
+        f'building {rng.choice(OBJECTS)}.',
+        '',
+        'Requirements:',
+    ]
+    lines += [f'- Experience with {skill}' for skill in skills[:-2]]
+    lines += [
+        f'- Nice to have: {skills[-2]} and {skills[-1]}',
+        f'- {rng.choice(["Bachelor", "Master"])} degree in Computer Science or related field',
+        '',
+        f'You will {" ".join(rng.choice(FILLER) for _ in range(rng.randint(10, 30)))}.'
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def to_docx(text):
+    """DOCX bytes with one paragraph per line"""
+    from docx import Document
+    document = Document()
+    for line in text.split('\n'):
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _pdf_escape(line):
+    """Escape a line for a PDF string literal"""
+    line = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return line.encode('latin-1', errors='replace')
+
+
+def to_pdf(text, lines_per_page=60, width=95):
+    """Minimal text-only PDF bytes, wrapping long lines"""
+    lines = []
+    for line in text.split('\n'):
+        while len(line) > width:
+            cut = line.rfind(' ', 0, width)
+            cut = cut if cut > 0 else width
+            lines.append(line[:cut])
+            line = line[cut:].lstrip()
+        lines.append(line)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = [b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    font_id = 1
+    pages_id = 2 + 2 * len(pages)
+    page_ids = []
+    for page in pages:
+        stream = (b'BT /F1 10 Tf 50 760 Td 12 TL '
+                  + b' '.join(b'(' + _pdf_escape(line) + b") '" for line in page)
+                  + b' ET')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R '
+                       b'/Resources << /Font << /F1 %d 0 R >> >> >>'
+                       % (pages_id, len(objects), font_id))
+        page_ids.append(len(objects))
+    objects.append(b'<< /Type /Pages /Kids [%s] /Count %d >>'
+                   % (b' '.join(b'%d 0 R' % page_id for page_id in page_ids), len(page_ids)))
+    objects.append(b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += (b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+               % (len(objects) + 1, len(objects), xref))
+    return bytes(output)
+
+
+def render(text, fmt):
+    """Document bytes for a text in the given format"""
+    if fmt == 'txt':
+        return text.encode('utf-8')
+    if fmt == 'docx':
+        return to_docx(text)
+    if fmt == 'pdf':
+        return to_pdf(text)
+    raise ValueError(f'Unknown format: {fmt}')
+
+
+def write_corpus(directory, count, formats=FORMATS, words=400, seed=0):
+    """Write resumes and a job description to a directory; returns the resume paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        text = generate_resume(index, words, seed)
+        for fmt in formats:
+            path = os.path.join(directory, f'resume_{index:06d}.{fmt}')
+            with open(path, 'wb') as file:
+                file.write(render(text, fmt))
+            paths.append(path)
+    with open(os.path.join(directory, 'job_description.txt'), 'w', encoding='utf-8') as file:
+        file.write(generate_job_description(0, seed))
+    return paths
+
+
+if __name__ == '__main__':
+    # python -m benchmarks.corpus OUTPUT_DIR [COUNT] [WORDS]
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'benchmark_corpus'
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    words = int(sys.argv[3]) if len(sys.argv) > 3 else 400
+    paths = write_corpus(directory, count, words=words)
+    print(f'Wrote {len(paths)} resumes to {directory}')
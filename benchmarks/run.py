@@ -0,0 +1,174 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks.corpus import FORMATS, generate_job_description, generate_resume, render
+from utils.matcher import ResumeMatcher, requirements_cache, results_cache
+from utils.resume_parser import ResumeParser
+
+DEFAULT_SIZES = (10, 1000, 100000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# A benchmark regresses when it is this much slower than its baseline
+DEFAULT_THRESHOLD = 0.25
+
+# Timings below this are too noisy to fail a run on
+MIN_GATED_SECONDS = 0.005
+
+# extract_text runs on at most this many documents per format and size
+EXTRACT_SAMPLE = 200
+
+# Sizes above this are timed once rather than best-of-repeat
+SINGLE_RUN_SIZE = 10000
+
+
+def best_of(func, repeat):
+    """Fastest of several runs of func, with garbage collection paused like timeit"""
+    best = None
+    for _ in range(repeat):
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        finally:
+            if gc_enabled:
+                gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def record(results, name, seconds, items):
+    """Store one timing with its per-item cost"""
+    results[name] = {
+        'seconds': round(seconds, 6),
+        'items': items,
+        'per_item_us': round(seconds * 1e6 / items, 3) if items else None
+    }
+    print(f'{name:<36} {items:>8} items {seconds:>10.4f} s {results[name]["per_item_us"]:>12} us/item')
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, words=400, repeat=3, extract_sample=EXTRACT_SAMPLE, seed=0):
+    """Time the parser and matcher stages at each corpus size; returns results by benchmark name"""
+    parser = ResumeParser()
+    matcher = ResumeMatcher()
+    job_description = generate_job_description(0, seed)
+    results = {}
+
+    # One size at a time, so each corpus is freed before the next is generated
+    for size in sizes:
+        runs = repeat if size <= SINGLE_RUN_SIZE else 1
+        _benchmark_size(results, parser, matcher, job_description, size, words, runs, extract_sample, seed)
+
+    return results
+
+
+def _benchmark_size(results, parser, matcher, job_description, size, words, runs, extract_sample, seed):
+    """Time every stage on one synthetic corpus, recording into results"""
+    texts = [generate_resume(index, words, seed) for index in range(size)]
+
+    sample = min(size, extract_sample)
+    for fmt in FORMATS:
+        documents = [render(texts[index], fmt) for index in range(sample)]
+        filename = f'resume.{fmt}'
+        seconds = best_of(lambda: [parser.extract_text(document, filename) for document in documents], runs)
+        record(results, f'extract_text[{fmt}]@{size}', seconds, sample)
+
+    parsed = []
+
+    def parse():
+        parsed[:] = [parser.parse_text(text) for text in texts]
+    record(results, f'parse_text@{size}', best_of(parse, runs), size)
+    for index, resume_data in enumerate(parsed):
+        resume_data['filename'] = f'resume_{index}.txt'
+
+    # Requirement extraction is per job description, so time distinct ones directly
+    job_descriptions = [generate_job_description(index, seed) for index in range(min(size, 1000))]
+    seconds = best_of(lambda: [matcher.extract_job_requirements(text) for text in job_descriptions], runs)
+    record(results, f'extract_job_requirements@{size}', seconds, len(job_descriptions))
+
+    def match():
+        # Cold caches, so every run scores the whole batch
+        requirements_cache.clear()
+        results_cache.clear()
+        matcher.match_resumes(parsed, job_description)
+    record(results, f'match_resumes@{size}', best_of(match, runs), size)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Benchmarks slower than their baseline by more than the threshold"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or base['seconds'] < MIN_GATED_SECONDS or base['items'] != result['items']:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        if ratio > 1 + threshold:
+            regressions.append((name, base['seconds'], result['seconds'], ratio))
+    return regressions
+
+
+def environment():
+    """Machine details stored with a baseline, since timings only compare on one machine"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'recorded': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description='Benchmark resume parsing and matching')
+    arguments.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                           help='comma-separated corpus sizes')
+    arguments.add_argument('--words', type=int, default=400, help='approximate words per resume')
+    arguments.add_argument('--repeat', type=int, default=3, help='runs per benchmark (best is kept)')
+    arguments.add_argument('--extract-sample', type=int, default=EXTRACT_SAMPLE,
+                           help='documents per format for extract_text')
+    arguments.add_argument('--seed', type=int, default=0, help='corpus seed')
+    arguments.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline results file')
+    arguments.add_argument('--save', action='store_true', help='store these results as the baseline')
+    arguments.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                           help='allowed slowdown before failing, e.g. 0.25 for 25%%')
+    options = arguments.parse_args(argv)
+
+    sizes = [int(size) for size in options.sizes.split(',') if size]
+    results = run_benchmarks(sizes, options.words, options.repeat, options.extract_sample, options.seed)
+
+    if options.save:
+        with open(options.baseline, 'w') as file:
+            json.dump({'environment': environment(), 'words': options.words, 'seed': options.seed,
+                       'results': results}, file, indent=2, sort_keys=True)
+        print(f'Saved baseline to {options.baseline}')
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print(f'No baseline at {options.baseline}; run with --save to create one')
+        return 0
+
+    with open(options.baseline) as file:
+        baseline = json.load(file)
+    if (baseline.get('words'), baseline.get('seed')) != (options.words, options.seed):
+        print('Baseline was recorded with a different corpus (--words/--seed); not comparing')
+        return 0
+
+    regressions = compare(results, baseline['results'], options.threshold)
+    for name, before, after, ratio in regressions:
+        print(f'REGRESSION {name}: {before:.4f} s -> {after:.4f} s ({(ratio - 1) * 100:.0f}% slower)')
+    if regressions:
+        return 1
+    print(f'No regressions beyond {options.threshold * 100:.0f}% against {options.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    # python -m benchmarks.run --save     record a baseline on this machine
+    # python -m benchmarks.run            compare against it; exits 1 on regressions
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import gc
+import os
+
+# Production serving profile: gunicorn -c gunicorn.conf.py app:app
+#
+# The app and every read-only scoring resource (stopwords, skill trie, parser,
+# matcher, semantic model) are loaded once in the master, then frozen out of the
+# garbage collector's reach so the forked workers keep sharing those pages.
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', str(os.cpu_count() or 1)))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Import the app in the master so workers inherit it instead of loading their own copy
+preload_app = True
+
+# Recycle workers after this many requests; the jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+# Workers above this resident size finish their request and are replaced (0 disables)
+WORKER_MAX_RSS_MB = int(os.environ.get('WORKER_MAX_RSS_MB', '768'))
+
+# Heartbeat files on tmpfs, so a slow disk cannot get workers killed
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Every web worker already parses in parallel with the others, so each gets a
+# share of the cores for its ingest pool rather than a pool of cpu_count workers
+os.environ.setdefault('INGEST_MAX_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+# No collections in the master while the app loads: freed objects would leave
+# holes in pages the workers are meant to share
+gc.disable()
+
+
+def when_ready(server):
+    """Load the read-only resources in the master, after the app and before any worker"""
+    from utils.resources import warm_up
+    report = warm_up()
+    server.log.info("Warmed up in %.3fs", report['timings'].get('warm_up', 0))
+
+
+def pre_fork(server, worker):
+    """Freeze everything loaded so far; collections in the worker then never touch (and copy) it"""
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Workers collect garbage as usual, just not the frozen master objects"""
+    gc.enable()
+
+
+def post_request(worker, req, environ, resp):
+    """Recycle a worker that has grown past WORKER_MAX_RSS_MB"""
+    if not WORKER_MAX_RSS_MB:
+        return
+    from utils.metrics import current_rss
+    rss = current_rss()
+    if rss and rss > WORKER_MAX_RSS_MB * 1024 * 1024:
+        worker.log.info("Worker %s at %dMB resident, recycling", worker.pid, rss // (1024 * 1024))
+        worker.alive = False
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Keep the app's on-disk stores out of the shared /tmp defaults
+_state = tempfile.mkdtemp(prefix='resume_tests_')
+os.environ.setdefault('PARSE_CACHE_DIR', os.path.join(_state, 'cache'))
+os.environ.setdefault('SCORE_STORE_PATH', os.path.join(_state, 'scores.sqlite3'))
+os.environ.setdefault('CORPUS_INDEX_PATH', os.path.join(_state, 'index.sqlite3'))
+os.environ.setdefault('JOBS_DB_PATH', os.path.join(_state, 'jobs.sqlite3'))
+os.environ.setdefault('JOBS_SPOOL_DIR', os.path.join(_state, 'spool'))
@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from utils.admission import AdmissionController, Overloaded
+
+# Workers are forked after the controller exists, like gunicorn with preload_app
+fork = multiprocessing.get_context('fork')
+
+
+def hold(controller, cost, admitted, done):
+    """Worker: take `cost`, report it, keep it until told to finish"""
+    ticket = controller.acquire(cost)
+    admitted.put(os.getpid())
+    done.wait(10)
+    ticket.release()
+
+
+def try_acquire(controller, cost, results):
+    """Worker: report whether `cost` was admitted or the reason it was turned away"""
+    try:
+        controller.acquire(cost).release()
+        results.put('admitted')
+    except Overloaded as exc:
+        results.put(exc.reason)
+
+
+def crash(controller, cost, admitted):
+    """Worker: take `cost` and exit without releasing it"""
+    controller.acquire(cost)
+    admitted.set()
+    os._exit(0)
+
+
+def start(target, *args):
+    process = fork.Process(target=target, args=args)
+    process.start()
+    return process
+
+
+def test_limit_is_shared_across_workers():
+    controller = AdmissionController(max_cost=2, queue_cost=0, queue_timeout=5)
+    admitted, results, done = fork.Queue(), fork.Queue(), fork.Event()
+
+    holder = start(hold, controller, 2, admitted, done)
+    admitted.get(timeout=10)
+    rejected = start(try_acquire, controller, 1, results)
+    assert results.get(timeout=10) == 'queue_full'
+    rejected.join(10)
+
+    done.set()
+    holder.join(10)
+    later = start(try_acquire, controller, 1, results)
+    assert results.get(timeout=10) == 'admitted'
+    later.join(10)
+
+    stats = controller.stats()
+    assert stats['admitted'] == 2
+    assert stats['rejected'] == {'queue_full': 1}
+    assert stats['in_flight_cost'] == 0
+
+
+def test_queued_worker_runs_after_another_releases():
+    controller = AdmissionController(max_cost=1, queue_cost=1, queue_timeout=10)
+    admitted, results, done = fork.Queue(), fork.Queue(), fork.Event()
+
+    holder = start(hold, controller, 1, admitted, done)
+    admitted.get(timeout=10)
+    waiter = start(try_acquire, controller, 1, results)
+    for _ in range(1000):
+        if controller.stats()['queue_depth'] == 1:
+            break
+        time.sleep(0.01)
+    assert controller.stats()['queue_depth'] == 1
+    assert results.empty()
+
+    # The queue is full too, so a third worker is turned away
+    with pytest.raises(Overloaded) as exc:
+        controller.acquire(1)
+    assert exc.value.status == 429
+
+    done.set()
+    assert results.get(timeout=10) == 'admitted'
+    holder.join(10)
+    waiter.join(10)
+    assert controller.stats()['queue_depth'] == 0
+
+
+def test_dead_worker_cost_is_reclaimed():
+    controller = AdmissionController(max_cost=2, queue_cost=0, queue_timeout=5)
+    admitted = fork.Event()
+
+    worker = start(crash, controller, 2, admitted)
+    assert admitted.wait(10)
+    worker.join(10)
+
+    controller.acquire(2).release()
+    assert controller.stats()['in_flight_cost'] == 0
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+from app import app
+
+JOB = 'Python developer with Django and SQL, 3+ years of experience. Bachelor degree required.'
+
+RESUMES = [
+    'Jane Doe\njane@example.com\nPython Django SQL developer, 5 years of experience.\n'
+    'Bachelor of Science in Computer Science',
+    'John Roe\njohn@example.com\nJava Spring engineer, 2 years of experience.'
+]
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def test_analyze_keeps_scores_only_when_rerankable(client):
+    response = client.post('/api/analyze', json={'job_description': JOB, 'resumes': RESUMES})
+    assert response.status_code == 200
+    assert 'result_id' not in response.get_json()
+
+    response = client.post('/api/analyze', json={'job_description': JOB, 'resumes': RESUMES,
+                                                 'rerankable': True})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['result_id']
+
+    response = client.post(f"/api/results/{result['result_id']}/rerank", json={})
+    assert response.status_code == 200
+    ranking = response.get_json()['ranking']
+    assert [entry['overall_score'] for entry in ranking] == \
+        [match['overall_score'] for match in result['matches']]
+    # No semantic model here, so there is no semantic score to report
+    assert all('semantic_score' not in entry for entry in ranking)
+
+
+def test_dedupe_leaves_non_text_resumes_out_of_clusters(client):
+    resumes = [RESUMES[0], 5, None, RESUMES[0]]
+    response = client.post('/api/analyze', json={'job_description': JOB, 'resumes': resumes,
+                                                 'dedupe': True})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert [match['filename'] for match in result['matches']] == ['Resume_1']
+    assert result['matches'][0]['duplicates'] == ['Resume_4']
+    assert sorted(error['filename'] for error in result['errors']) == ['Resume_2', 'Resume_3']
+
+
+def test_upload_dedupe_scores_identical_files_once(client):
+    files = [(io.BytesIO(RESUMES[0].encode()), 'jane.txt'),
+             (io.BytesIO(RESUMES[0].encode()), 'jane_copy.txt'),
+             (io.BytesIO(RESUMES[1].encode()), 'john.txt')]
+    response = client.post('/upload', data={'job_description': JOB, 'resumes': files, 'dedupe': '1'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert page.count('class="resume-card"') == 2
+    assert 'jane_copy.txt' in page
+
+
+@pytest.mark.parametrize('job_description', [123, ['Python developer'], {'text': 'Python'}, None])
+def test_analyze_rejects_non_string_job_description(client, job_description):
+    response = client.post('/api/analyze', json={'job_description': job_description, 'resumes': RESUMES})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'job_description must be a string'
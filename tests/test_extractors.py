@@ -0,0 +1,54 @@
+import pytest
+
+from utils import extractors
+
+
+class FakeBackend(extractors.PDFBackend):
+    @classmethod
+    def available(cls):
+        return True
+
+    def open(self, stream):
+        return stream
+
+    def page_count(self, document):
+        return 1
+
+    def page_text(self, document, index):
+        return ''
+
+
+class SlowBackend(FakeBackend):
+    name = 'pymupdf'
+
+
+class FastBackend(FakeBackend):
+    name = 'pypdf2'
+
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    monkeypatch.setattr(extractors, '_backends', {'pymupdf': SlowBackend, 'pypdf2': FastBackend})
+    monkeypatch.setattr(extractors, '_instances', {})
+    monkeypatch.setattr(extractors, '_timings', {})
+    monkeypatch.setattr(extractors, '_unreported', {})
+    monkeypatch.setattr(extractors, 'PDF_AUTO_SAMPLE_DOCUMENTS', 2)
+
+
+def test_backend_must_implement_interface():
+    class Partial(extractors.PDFBackend):
+        def open(self, stream):
+            return stream
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_auto_samples_every_backend_before_picking_fastest(fake_backends):
+    chosen = []
+    for _ in range(4):
+        name = extractors.get_backend('auto').name
+        chosen.append(name)
+        extractors.record_timing(name, 10, 1.0 if name == 'pymupdf' else 0.1)
+    assert chosen == ['pymupdf', 'pymupdf', 'pypdf2', 'pypdf2']
+    assert extractors.get_backend('auto').name == 'pypdf2'
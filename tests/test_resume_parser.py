@@ -0,0 +1,11 @@
+from utils.resume_parser import ResumeParser
+
+
+def test_phone_formats_keep_priority_order():
+    parser = ResumeParser()
+    # The parenthesized number comes first, but the plain format has priority
+    text = 'Jane Doe\nPhone: (555) 123-4567\nMobile: 555.987.6543\n'
+    assert parser.extract_phone(text) == '555.987.6543'
+    assert parser.parse_text(text)['phone'] == '555.987.6543'
+
+    assert parser.extract_phone('Call +44 7700 900 123 or (555) 123-4567') == '(555) 123-4567'
@@ -0,0 +1,33 @@
+import pytest
+
+from utils.tokenizer import regex_tokenize
+
+nltk_tokenize = pytest.importorskip('nltk.tokenize')
+
+# Quotes, clitics and abbreviations; no double quotes, which NLTK rewrites to `` and ''
+PARITY_TEXTS = [
+    "He said 'single quotes' here.",
+    "'Python' and 'SQL' skills (see 'Projects').",
+    "I like 'a' lot; rock 'n' roll in the '90s.",
+    "It's Jones' book, 'tis said. 'Twas fine, we'll see.",
+    "I won't use C++ or C#, they'd say; I can't.",
+    "Worked at Acme Inc. in the U.S.A. for 3.5 yrs. with Dr. Smith.",
+    "B.Sc. in CS, e.g. node.js and i.e. 10,000 users at 12:30.",
+]
+
+
+def reference_tokenize(text):
+    """word_tokenize's two steps, with an untrained Punkt (no punkt_tab data needed)"""
+    sentences = nltk_tokenize.PunktSentenceTokenizer().tokenize(text)
+    word_tokenizer = nltk_tokenize.NLTKWordTokenizer()
+    return [token for sentence in sentences for token in word_tokenizer.tokenize(sentence)]
+
+
+@pytest.mark.parametrize('text', PARITY_TEXTS)
+def test_matches_nltk(text):
+    assert regex_tokenize(text) == reference_tokenize(text)
+
+
+def test_opening_quote_is_split_off():
+    assert regex_tokenize("'single") == ["'", 'single']
+    assert regex_tokenize("rock 's") == ['rock', "'s"]
@@ -0,0 +1,238 @@
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from utils import metrics
+from utils.extractors import PDF_MAX_PAGES
+
+# Work admitted at once, in cost units (0 disables admission control); shared by
+# every worker forked after the app is imported (gunicorn preload_app)
+ADMISSION_MAX_COST = int(os.environ.get('ADMISSION_MAX_COST', '256'))
+
+# Cost allowed to wait for a slot; requests beyond it are turned away at once
+ADMISSION_QUEUE_COST = int(os.environ.get('ADMISSION_QUEUE_COST', '1024'))
+
+# Longest a request waits in the queue before giving up
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '15'))
+
+# Cost units: one per resume, one per estimated PDF page, one per this many input bytes
+ADMISSION_COST_BYTES = int(os.environ.get('ADMISSION_COST_BYTES', str(256 * 1024)))
+
+# Rough PDF page size, for estimating pages before a file is opened
+PDF_BYTES_PER_PAGE = 50 * 1024
+
+# Bounds of the Retry-After hint, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+# How often a queued request checks for workers that died holding admitted work
+REAP_INTERVAL = 1.0
+
+# Shared slot fields and states; one slot per admitted or queued request
+_PID, _TICKET, _COST, _STATE = range(4)
+_FREE, _WAITING, _RUNNING = 0, 1, 2
+
+# Shared counters
+_NEXT_TICKET, _ADMITTED = 0, 1
+_REJECTED = {'queue_full': 2, 'timeout': 3}
+
+
+def estimate_pdf_pages(size):
+    """Pages a PDF of this many bytes will cost, capped like extraction itself"""
+    pages = max(1, math.ceil(size / PDF_BYTES_PER_PAGE))
+    return min(pages, PDF_MAX_PAGES) if PDF_MAX_PAGES else pages
+
+
+def estimate_cost(documents, total_bytes=0, pages=0):
+    """Cost of parsing and matching a request's resumes"""
+    return max(1, documents + pages + total_bytes // ADMISSION_COST_BYTES)
+
+
+class Overloaded(Exception):
+    def __init__(self, message, status, retry_after, reason):
+        """Raised when a request is not admitted; carries its HTTP status and Retry-After"""
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Ticket:
+    def __init__(self, controller, cost, slot=None):
+        """Admitted work; release() hands its cost back exactly once"""
+        self.controller = controller
+        self.cost = cost
+        self.slot = slot
+        self.started = time.perf_counter()
+        self._released = False
+
+    def release(self):
+        """Return the ticket's cost to the controller"""
+        if not self._released:
+            self._released = True
+            self.controller._release(self.slot, self.cost, time.perf_counter() - self.started)
+
+
+class AdmissionController:
+    def __init__(self, max_cost=ADMISSION_MAX_COST, queue_cost=ADMISSION_QUEUE_COST,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT):
+        """Cost-weighted concurrency limit with a bounded FIFO queue for the rest
+
+        The state lives in shared memory, so processes forked after this point
+        (gunicorn workers with preload_app) share one limit and one queue.
+        """
+        self.max_cost = max_cost
+        self.queue_cost = queue_cost
+        self.queue_timeout = queue_timeout
+        self._condition = multiprocessing.Condition()
+        # Every admitted or queued request costs at least 1, so this many slots always suffice
+        self._slots = np.frombuffer(multiprocessing.RawArray('q', 4 * max(1, max_cost + queue_cost)),
+                                    dtype=np.int64).reshape(-1, 4)
+        self._counters = np.frombuffer(multiprocessing.RawArray('q', 4), dtype=np.int64)
+        # Moving average of seconds per cost unit, for Retry-After hints (NaN until measured)
+        self._seconds_per_unit = np.frombuffer(multiprocessing.RawArray('d', [math.nan]), dtype=np.float64)
+
+    def acquire(self, cost):
+        """Admit work of the given cost, queueing if needed; returns a Ticket or raises Overloaded"""
+        if not self.max_cost:
+            return Ticket(self, 0)
+        # A request larger than the whole budget runs alone instead of never
+        cost = max(1, min(cost, self.max_cost))
+        started = time.perf_counter()
+
+        with self._condition:
+            self._reap()
+            if self._waiting().size or self._in_flight() + cost > self.max_cost:
+                if self._queued() + cost > self.queue_cost:
+                    self._reject('queue_full', 429, cost)
+                slot = self._claim(cost, _WAITING)
+                self._wait(slot, cost, started + self.queue_timeout)
+            else:
+                slot = self._claim(cost, _RUNNING)
+            self._counters[_ADMITTED] += 1
+            self._update_gauges()
+
+        metrics.registry.observe(metrics.ADMISSION_WAIT, time.perf_counter() - started)
+        return Ticket(self, cost, slot)
+
+    def _claim(self, cost, state):
+        """Take a free slot for this process's request (caller holds the condition)"""
+        slot = int(np.flatnonzero(self._slots[:, _STATE] == _FREE)[0])
+        self._slots[slot] = (os.getpid(), self._counters[_NEXT_TICKET], cost, state)
+        self._counters[_NEXT_TICKET] += 1
+        return slot
+
+    def _wait(self, slot, cost, deadline):
+        """Wait (holding the condition) until this request is first in line and fits"""
+        self._update_gauges()
+        try:
+            while self._first_waiting() != slot or self._in_flight() + cost > self.max_cost:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._reject('timeout', 503, cost)
+                # Wake now and then to notice workers that died without releasing
+                self._condition.wait(min(remaining, REAP_INTERVAL))
+                self._reap()
+            self._slots[slot, _STATE] = _RUNNING
+        except BaseException:
+            self._slots[slot] = 0
+            raise
+        finally:
+            # The next request in line may fit now (or may be first in line now)
+            self._condition.notify_all()
+
+    def _reap(self):
+        """Free the slots of processes that exited without releasing them (caller holds the condition)"""
+        occupied = self._slots[:, _STATE] != _FREE
+        freed = False
+        for pid in np.unique(self._slots[occupied, _PID]).tolist():
+            if pid == os.getpid():
+                continue
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                self._slots[occupied & (self._slots[:, _PID] == pid)] = 0
+                freed = True
+            except PermissionError:
+                pass
+        if freed:
+            self._condition.notify_all()
+
+    def _in_flight(self):
+        return int(self._slots[self._slots[:, _STATE] == _RUNNING, _COST].sum())
+
+    def _waiting(self):
+        return np.flatnonzero(self._slots[:, _STATE] == _WAITING)
+
+    def _queued(self):
+        return int(self._slots[self._waiting(), _COST].sum())
+
+    def _first_waiting(self):
+        """Slot of the longest-waiting request"""
+        waiting = self._waiting()
+        return int(waiting[np.argmin(self._slots[waiting, _TICKET])])
+
+    def _reject(self, reason, status, cost):
+        """Count a rejection and raise Overloaded (caller holds the condition)"""
+        self._counters[_REJECTED[reason]] += 1
+        metrics.registry.inc(metrics.ADMISSION_REJECTED, reason=reason)
+        if reason == 'queue_full':
+            message = 'Server is busy: too much work is already queued'
+        else:
+            message = f'Server is busy: not admitted within {self.queue_timeout:g}s'
+        raise Overloaded(message, status, self._retry_after(cost), reason)
+
+    def _retry_after(self, cost):
+        """Seconds until the queued and running work (plus this request) should have drained"""
+        seconds_per_unit = self._seconds_per_unit[0]
+        if math.isnan(seconds_per_unit):
+            return MIN_RETRY_AFTER
+        # Every admitted cost unit holds its share of the budget for seconds_per_unit
+        seconds = (self._in_flight() + self._queued() + cost) * seconds_per_unit / self.max_cost
+        return int(min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(seconds))))
+
+    def _release(self, slot, cost, seconds):
+        """Hand back an admitted request's cost and wake the queue"""
+        if not cost:
+            return
+        with self._condition:
+            # Skip a slot already reaped and reused (only if this process was thought dead)
+            if self._slots[slot, _PID] == os.getpid() and self._slots[slot, _STATE] == _RUNNING:
+                self._slots[slot] = 0
+            per_unit = seconds / cost
+            previous = self._seconds_per_unit[0]
+            self._seconds_per_unit[0] = per_unit if math.isnan(previous) else 0.8 * previous + 0.2 * per_unit
+            self._update_gauges()
+            self._condition.notify_all()
+
+    def _update_gauges(self):
+        """Publish the current load to the metrics registry (caller holds the condition)"""
+        registry = metrics.registry
+        registry.set_gauge(metrics.ADMISSION_IN_FLIGHT, self._in_flight())
+        registry.set_gauge(metrics.ADMISSION_QUEUE_DEPTH, self._waiting().size)
+        registry.set_gauge(metrics.ADMISSION_QUEUED_COST, self._queued())
+
+    def stats(self):
+        """Limits, current load and admission counters, across every process sharing the controller"""
+        with self._condition:
+            seconds_per_unit = self._seconds_per_unit[0]
+            return {
+                'max_cost': self.max_cost,
+                'queue_cost': self.queue_cost,
+                'queue_timeout': self.queue_timeout,
+                'in_flight_cost': self._in_flight(),
+                'queue_depth': int(self._waiting().size),
+                'queued_cost': self._queued(),
+                'admitted': int(self._counters[_ADMITTED]),
+                'rejected': {reason: int(self._counters[index]) for reason, index in _REJECTED.items()
+                             if self._counters[index]},
+                'seconds_per_unit': (round(float(seconds_per_unit), 6)
+                                     if not math.isnan(seconds_per_unit) else None)
+            }
+
+
+# Admission controller for parse/match work, shared with forked workers
+admission = AdmissionController()
@@ -0,0 +1,169 @@
+import math
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from utils.semantic import similarity_scores
+
+
+class ResumeFeatures:
+    def __init__(self, resume_list):
+        """Build sparse term matrices and feature arrays for a batch of parsed resumes"""
+        self.size = len(resume_list)
+
+        # Keyword counts: one row per resume, one column per distinct keyword
+        self.keyword_vocab = {}
+        keyword_lists = [resume_data.get('keywords', []) for resume_data in resume_list]
+        self.keywords = self._matrix(keyword_lists, self.keyword_vocab)
+        self.keyword_norms = np.sqrt(np.asarray(self.keywords.multiply(self.keywords).sum(axis=1)).ravel())
+
+        # Skill indicators over distinct lowercased skills
+        self.skill_vocab = {}
+        skill_sets = [{skill.lower() for skill in resume_data.get('skills', [])}
+                      for resume_data in resume_list]
+        self.skills = self._matrix(skill_sets, self.skill_vocab)
+
+        self.experience = np.array([resume_data.get('experience_years', 0)
+                                    for resume_data in resume_list], dtype=np.float64)
+
+        # Education is matched by substring, so keep the joined lowercase text
+        self.education_text = [" ".join(resume_data.get('education', [])).lower()
+                               if resume_data.get('education') else None
+                               for resume_data in resume_list]
+
+        # Resume texts for the optional semantic score, embedded on first use
+        # (corpus searches fill in precomputed vectors instead)
+        self.texts = [resume_data.get('raw_text', '') for resume_data in resume_list]
+        self.semantic_vectors = None
+
+    def _matrix(self, term_lists, vocab):
+        """CSR matrix of term counts, one row per term list; fills vocab with column ids"""
+        lookup = vocab.setdefault
+        columns = [lookup(term, len(vocab)) for terms in term_lists for term in terms]
+        lengths = np.fromiter((len(terms) for terms in term_lists), dtype=np.int64, count=self.size)
+        rows = np.repeat(np.arange(self.size), lengths)
+
+        # Duplicate (row, column) pairs are summed into counts
+        data = np.ones(len(columns), dtype=np.float64)
+        return sparse.csr_matrix((data, (rows, columns)), shape=(self.size, len(vocab)))
+
+    def keyword_scores(self, job_keywords):
+        """Cosine similarity between every resume's keywords and the job keywords"""
+        scores = np.zeros(self.size)
+        if not job_keywords or not self.size:
+            return scores
+
+        job_counter = Counter(job_keywords)
+        job_norm = math.sqrt(sum(count ** 2 for count in job_counter.values()))
+
+        job_vector = np.zeros(len(self.keyword_vocab))
+        for word, count in job_counter.items():
+            column = self.keyword_vocab.get(word)
+            if column is not None:
+                job_vector[column] = count
+
+        numerator = self.keywords @ job_vector
+        common = numerator > 0
+        scores[common] = numerator[common] / (self.keyword_norms[common] * job_norm)
+        return np.minimum(scores, 1.0)
+
+    def keyword_score_matrix(self, job_keyword_lists):
+        """Keyword cosine similarity of every resume against every job (resumes x jobs)"""
+        count = len(job_keyword_lists)
+        rows, columns, counts = [], [], []
+        job_norms = np.zeros(count)
+        for j, job_keywords in enumerate(job_keyword_lists):
+            job_counter = Counter(job_keywords)
+            job_norms[j] = math.sqrt(sum(value ** 2 for value in job_counter.values()))
+            for word, value in job_counter.items():
+                row = self.keyword_vocab.get(word)
+                if row is not None:
+                    rows.append(row)
+                    columns.append(j)
+                    counts.append(value)
+        job_matrix = sparse.csr_matrix((np.array(counts, dtype=np.float64), (rows, columns)),
+                                       shape=(len(self.keyword_vocab), count))
+
+        # Same products and divisions as keyword_scores, one column per job
+        numerator = (self.keywords @ job_matrix).toarray()
+        scores = np.zeros((self.size, count))
+        common = numerator > 0
+        scores[common] = numerator[common] / np.outer(self.keyword_norms, job_norms)[common]
+        return np.minimum(scores, 1.0)
+
+    def skill_score_matrix(self, required_skill_lists):
+        """Fraction of each job's required skills present in every resume (resumes x jobs)"""
+        count = len(required_skill_lists)
+        rows, columns = [], []
+        lengths = np.zeros(count)
+        for j, required_skills in enumerate(required_skill_lists):
+            required_skills_lower = [skill.lower() for skill in required_skills]
+            lengths[j] = len(required_skills_lower)
+            for skill in set(required_skills_lower):
+                row = self.skill_vocab.get(skill)
+                if row is not None:
+                    rows.append(row)
+                    columns.append(j)
+        job_matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)),
+                                       shape=(len(self.skill_vocab), count))
+
+        matched = (self.skills @ job_matrix).toarray()
+        scores = np.minimum(matched / np.maximum(lengths, 1), 1.0)
+        scores[:, lengths == 0] = 0.5  # Neutral score if no specific skills mentioned
+        return scores
+
+    def skill_scores(self, required_skills):
+        """Fraction of required skills present in every resume"""
+        if not required_skills:
+            return np.full(self.size, 0.5)  # Neutral score if no specific skills mentioned
+
+        required_skills_lower = [skill.lower() for skill in required_skills]
+        required_vector = np.zeros(len(self.skill_vocab))
+        for skill in set(required_skills_lower):
+            column = self.skill_vocab.get(skill)
+            if column is not None:
+                required_vector[column] = 1.0
+
+        matched = self.skills @ required_vector
+        return np.minimum(matched / len(required_skills_lower), 1.0)
+
+    def semantic_score_matrix(self, model, job_vectors):
+        """Semantic similarity of every resume against every job vector (resumes x jobs)"""
+        if self.semantic_vectors is None:
+            self.semantic_vectors = model.embed(self.texts)
+        return similarity_scores(self.semantic_vectors, np.asarray(job_vectors).reshape(-1, model.dimensions))
+
+    def semantic_scores(self, model, job_vector):
+        """Semantic similarity of every resume to one job vector"""
+        return self.semantic_score_matrix(model, job_vector)[:, 0]
+
+    def experience_scores(self, required_experience):
+        """Experience match for every resume, same tiers as calculate_experience_match"""
+        experience = self.experience
+        if required_experience == 0:
+            return np.ones(self.size)
+
+        return np.select(
+            [experience >= required_experience,
+             experience >= required_experience * 0.8,
+             experience >= required_experience * 0.5],
+            [1.0, 0.8, 0.5],
+            default=experience / required_experience
+        )
+
+    def education_scores(self, job_education_keywords):
+        """Share of job education keywords found in every resume's education lines"""
+        if not job_education_keywords:
+            return np.ones(self.size)
+
+        matches = np.zeros(self.size)
+        for keyword in job_education_keywords:
+            keyword = keyword.lower()
+            matches += np.fromiter((text is not None and keyword in text
+                                    for text in self.education_text),
+                                   dtype=np.float64, count=self.size)
+
+        has_education = np.fromiter((text is not None for text in self.education_text),
+                                    dtype=bool, count=self.size)
+        return np.where(has_education, matches / len(job_education_keywords), 0.2)
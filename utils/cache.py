@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.resume_parser import PARSER_VERSION, ParsedResume
+from utils.skills import get_skill_matcher
+from utils.tokenizer import TOKENIZER
+
+# Cache configuration (an empty PARSE_CACHE_DIR disables the on-disk tier)
+PARSE_CACHE_SIZE = int(os.environ.get('PARSE_CACHE_SIZE', '1024'))
+PARSE_CACHE_DIR = os.environ.get('PARSE_CACHE_DIR', '/tmp/resume_cache')
+PARSE_CACHE_DISK_ENTRIES = int(os.environ.get('PARSE_CACHE_DISK_ENTRIES', '100000'))
+
+# Prune the on-disk tier every this many writes rather than on every put
+_PRUNE_INTERVAL = 256
+
+# A disk hit only refreshes its access time when the stored one is older than this
+# (seconds), so reads do not each cost a committed write; pruning order is coarse
+_ACCESS_INTERVAL = 3600
+
+
+def content_key(content, kind='text'):
+    """Cache key for resume bytes or text, tied to the parser version"""
+    if isinstance(content, str):
+        content = content.encode('utf-8', errors='surrogatepass')
+    digest = hashlib.sha256(content).hexdigest()
+    return f"{kind}:{digest}:{PARSER_VERSION}:{TOKENIZER}:{get_skill_matcher().fingerprint}"
+
+
+def file_key(file_path):
+    """Cache key for a file on disk, hashed in chunks"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            sha.update(chunk)
+    # Files are parsed by extension and texts are not, so neither may share keys
+    kind = os.path.splitext(file_path)[1].lower() or 'file'
+    return f"{kind}:{sha.hexdigest()}:{PARSER_VERSION}:{TOKENIZER}:{get_skill_matcher().fingerprint}"
+
+
+class LRUCache:
+    def __init__(self, max_entries):
+        """Thread-safe in-memory LRU cache with hit/miss/eviction counters"""
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss/eviction counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'capacity': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class ParseCache:
+    def __init__(self, max_entries=PARSE_CACHE_SIZE, directory=PARSE_CACHE_DIR,
+                 max_disk_entries=PARSE_CACHE_DISK_ENTRIES):
+        """Two-tier cache of parsed resumes: in-memory LRU backed by SQLite"""
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_failed = False
+        self._writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def _connect(self):
+        """Open the on-disk tier on first use (caller holds the lock)"""
+        if self._db is None and not self._db_failed and self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                db = sqlite3.connect(os.path.join(self.directory, 'parse_cache.sqlite3'),
+                                     timeout=5, check_same_thread=False)
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('CREATE TABLE IF NOT EXISTS parsed '
+                           '(key TEXT PRIMARY KEY, data TEXT NOT NULL, accessed REAL NOT NULL)')
+                db.execute('CREATE INDEX IF NOT EXISTS parsed_accessed ON parsed (accessed)')
+                db.commit()
+                self._db = db
+            except (sqlite3.Error, OSError):
+                # Read-only or ephemeral filesystems fall back to memory only
+                self._db_failed = True
+        return self._db
+
+    def _remember(self, key, data):
+        """Insert into the memory tier, evicting the least recently used entry"""
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        """Return a copy of the cached parse result, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data.copy()
+
+            db = self._connect()
+            if db is not None:
+                try:
+                    row = db.execute('SELECT data, accessed FROM parsed WHERE key = ?', (key,)).fetchone()
+                    if row is not None:
+                        now = time.time()
+                        if now - row[1] > _ACCESS_INTERVAL:
+                            db.execute('UPDATE parsed SET accessed = ? WHERE key = ?', (now, key))
+                            db.commit()
+                        data = ParsedResume.from_dict(json.loads(row[0]))
+                        self._remember(key, data)
+                        self.disk_hits += 1
+                        return data.copy()
+                except sqlite3.Error:
+                    pass
+
+            self.misses += 1
+            return None
+
+    def put(self, key, data):
+        """Store a parse result in both tiers"""
+        # The memory tier keeps compact records; callers get copies to modify
+        data = data.copy() if isinstance(data, ParsedResume) else ParsedResume.from_dict(data)
+        with self._lock:
+            self._remember(key, data)
+
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute('INSERT OR REPLACE INTO parsed (key, data, accessed) VALUES (?, ?, ?)',
+                           (key, json.dumps(data.to_dict()), time.time()))
+                self._writes += 1
+                if self._writes % _PRUNE_INTERVAL == 0:
+                    self._prune(db)
+                db.commit()
+            except sqlite3.Error:
+                pass
+
+    def _prune(self, db):
+        """Drop the least recently used rows beyond the on-disk bound"""
+        count = db.execute('SELECT COUNT(*) FROM parsed').fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            db.execute('DELETE FROM parsed WHERE key IN '
+                       '(SELECT key FROM parsed ORDER BY accessed LIMIT ?)', (excess,))
+            self.disk_evictions += excess
+
+    def stats(self):
+        """Hit/miss/eviction counters for sizing the cache"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = None
+            db = self._connect()
+            if db is not None:
+                try:
+                    disk_entries = db.execute('SELECT COUNT(*) FROM parsed').fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                'memory_entries': len(self._memory),
+                'memory_capacity': self.max_entries,
+                'disk_entries': disk_entries,
+                'disk_capacity': self.max_disk_entries if self._db is not None else None,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'hit_ratio': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+# Process-wide parse cache shared by every request
+parse_cache = ParseCache()
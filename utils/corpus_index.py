@@ -0,0 +1,355 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from utils import metrics
+from utils.batch_scoring import ResumeFeatures
+from utils.matcher import shared_matcher
+from utils.resume_parser import ParsedResume
+from utils.semantic import SEMANTIC_CANDIDATES, get_vector_index
+
+# Location of the on-disk corpus index
+CORPUS_INDEX_PATH = os.environ.get('CORPUS_INDEX_PATH', '/tmp/resume_corpus/index.sqlite3')
+
+# Posting kinds: resume keywords and lowercased skills
+KEYWORD = 'k'
+SKILL = 's'
+
+# Documents scored per step of a top_k search; generic terms ("experience",
+# "years") make nearly every document a candidate, so candidates are scored in
+# order of their best possible score until none left can reach the top_k
+SEARCH_BATCH = int(os.environ.get('CORPUS_SEARCH_BATCH', '64'))
+
+# Parsed fields the scorer reads, stored apart from the raw text
+FEATURE_FIELDS = ('skills', 'keywords', 'experience_years', 'education')
+
+# Stay well below SQLite's bound-parameter limit when querying many terms
+_QUERY_CHUNK = 500
+
+
+class CorpusIndex:
+    def __init__(self, path=CORPUS_INDEX_PATH):
+        """Inverted index of parsed resumes stored in SQLite"""
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the index on first use, creating the schema (caller holds the lock)"""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filename TEXT,
+                    data TEXT NOT NULL,
+                    keyword_count INTEGER NOT NULL,
+                    added REAL NOT NULL,
+                    features TEXT,
+                    keyword_norm REAL,
+                    experience_years REAL
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    kind TEXT NOT NULL,
+                    term TEXT NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (kind, term, doc_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+                CREATE TABLE IF NOT EXISTS terms (
+                    kind TEXT NOT NULL,
+                    term TEXT NOT NULL,
+                    df INTEGER NOT NULL,
+                    PRIMARY KEY (kind, term)
+                ) WITHOUT ROWID;
+            ''')
+            # Indexes created before the scoring columns get them filled in once
+            columns = [row[1] for row in db.execute('PRAGMA table_info(documents)')]
+            for column, kind in (('features', 'TEXT'), ('keyword_norm', 'REAL'),
+                                 ('experience_years', 'REAL')):
+                if column not in columns:
+                    db.execute(f'ALTER TABLE documents ADD COLUMN {column} {kind}')
+            rows = db.execute('SELECT doc_id, data FROM documents WHERE features IS NULL').fetchall()
+            db.executemany('UPDATE documents SET features = ?, keyword_norm = ?, experience_years = ? '
+                           'WHERE doc_id = ?',
+                           [self._scoring_columns(json.loads(data)) + (doc_id,) for doc_id, data in rows])
+            db.commit()
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _scoring_columns(parsed_data):
+        """(features JSON, keyword norm, experience years): what searches read instead of raw_text"""
+        features = json.dumps({name: parsed_data.get(name) for name in FEATURE_FIELDS
+                               if parsed_data.get(name) is not None})
+        keyword_norm = math.sqrt(sum(count ** 2 for count in
+                                     Counter(parsed_data.get('keywords', [])).values()))
+        return features, keyword_norm, parsed_data.get('experience_years', 0)
+
+    @staticmethod
+    def _postings(parsed_data):
+        """(kind, term, tf) postings for one parsed resume"""
+        postings = [(KEYWORD, term, tf)
+                    for term, tf in Counter(parsed_data.get('keywords', [])).items()]
+        postings.extend((SKILL, skill, 1)
+                        for skill in {skill.lower() for skill in parsed_data.get('skills', [])})
+        return postings
+
+    def add(self, parsed_data):
+        """Add a parsed resume to the index; returns its document id"""
+        postings = self._postings(parsed_data)
+        with self._lock:
+            db = self._connect()
+            with db:
+                cursor = db.execute(
+                    'INSERT INTO documents (filename, data, keyword_count, added, features, '
+                    'keyword_norm, experience_years) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (parsed_data.get('filename'), json.dumps(dict(parsed_data)),
+                     len(parsed_data.get('keywords', [])), time.time()) + self._scoring_columns(parsed_data)
+                )
+                doc_id = cursor.lastrowid
+                db.executemany('INSERT INTO postings (kind, term, doc_id, tf) VALUES (?, ?, ?, ?)',
+                               [(kind, term, doc_id, tf) for kind, term, tf in postings])
+                db.executemany('INSERT INTO terms (kind, term, df) VALUES (?, ?, 1) '
+                               'ON CONFLICT (kind, term) DO UPDATE SET df = df + 1',
+                               [(kind, term) for kind, term, tf in postings])
+        return doc_id
+
+    def delete(self, doc_id):
+        """Remove a resume and its postings; returns False if it was not indexed"""
+        with self._lock:
+            db = self._connect()
+            with db:
+                postings = db.execute('SELECT kind, term FROM postings WHERE doc_id = ?',
+                                      (doc_id,)).fetchall()
+                deleted = db.execute('DELETE FROM documents WHERE doc_id = ?', (doc_id,)).rowcount
+                if not deleted:
+                    return False
+                db.execute('DELETE FROM postings WHERE doc_id = ?', (doc_id,))
+                db.executemany('UPDATE terms SET df = df - 1 WHERE kind = ? AND term = ?', postings)
+                db.execute('DELETE FROM terms WHERE df <= 0')
+        return True
+
+    def get(self, doc_id):
+        """Return the stored parsed resume, or None"""
+        with self._lock:
+            row = self._connect().execute('SELECT data FROM documents WHERE doc_id = ?',
+                                          (doc_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def documents(self):
+        """Every stored (doc_id, parsed resume) pair in doc_id order"""
+        with self._lock:
+            rows = self._connect().execute('SELECT doc_id, data FROM documents ORDER BY doc_id').fetchall()
+        return [(doc_id, json.loads(data)) for doc_id, data in rows]
+
+    def _select(self, db, query, values, *params):
+        """Rows of a query with an IN ({placeholders}) over values, run in chunks"""
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), _QUERY_CHUNK):
+            chunk = values[start:start + _QUERY_CHUNK]
+            rows.extend(db.execute(query.format(placeholders=','.join('?' * len(chunk))),
+                                   list(params) + chunk))
+        return rows
+
+    def _upper_bounds(self, db, matcher, job_requirements, semantic):
+        """Highest overall score (percent) of each document sharing a job term; returns (doc_ids, bounds)
+
+        Skill, keyword and experience scores are exact (from postings and stored
+        columns); education and the semantic score count as perfect.
+        """
+        weights = matcher.weights
+        required_skills = [skill.lower() for skill in job_requirements['required_skills']]
+        job_counter = Counter(job_requirements['all_keywords'])
+        job_norm = math.sqrt(sum(count ** 2 for count in job_counter.values()))
+
+        # Keyword dot products, one query per distinct job term count
+        dots = Counter()
+        by_count = {}
+        for term, count in job_counter.items():
+            by_count.setdefault(count, []).append(term)
+        for count, terms in by_count.items():
+            for doc_id, tf in self._select(db, "SELECT doc_id, SUM(tf) FROM postings WHERE kind = ? "
+                                               "AND term IN ({placeholders}) GROUP BY doc_id",
+                                           terms, KEYWORD):
+                dots[doc_id] += tf * count
+
+        matched = Counter()
+        for doc_id, count in self._select(db, "SELECT doc_id, COUNT(*) FROM postings WHERE kind = ? "
+                                              "AND term IN ({placeholders}) GROUP BY doc_id",
+                                          set(required_skills), SKILL):
+            matched[doc_id] += count
+
+        doc_ids = dots.keys() | matched.keys()
+        if len(doc_ids) * 4 > self._count(db):
+            # Most of the corpus: one scan beats many IN (...) lookups
+            rows = [row for row in db.execute('SELECT doc_id, keyword_norm, experience_years FROM documents')
+                    if row[0] in doc_ids]
+        else:
+            rows = self._select(db, 'SELECT doc_id, keyword_norm, experience_years FROM documents '
+                                    'WHERE doc_id IN ({placeholders})', doc_ids)
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ids, keyword_norms, experience = (np.array(column, dtype=np.float64) for column in zip(*rows))
+        ids = ids.astype(np.int64)
+        keyword_norms = np.nan_to_num(keyword_norms)
+        experience = np.nan_to_num(experience)
+
+        if required_skills:
+            skill_scores = np.minimum(np.array([matched[doc_id] for doc_id in ids.tolist()])
+                                      / len(required_skills), 1.0)
+        else:
+            skill_scores = np.full(len(ids), 0.5)
+        dot = np.array([dots[doc_id] for doc_id in ids.tolist()], dtype=np.float64)
+        keyword_scores = np.zeros(len(ids))
+        common = (dot > 0) & (keyword_norms > 0)
+        if job_norm:
+            keyword_scores[common] = np.minimum(dot[common] / (keyword_norms[common] * job_norm), 1.0)
+
+        # Same steps as calculate_experience_match
+        required = job_requirements['experience_required']
+        if required == 0:
+            experience_scores = np.ones(len(ids))
+        else:
+            experience_scores = np.select(
+                [experience >= required, experience >= required * 0.8, experience >= required * 0.5],
+                [1.0, 0.8, 0.5],
+                default=experience / required
+            )
+
+        bounds = (skill_scores * weights['skills'] + experience_scores * weights['experience'] +
+                  keyword_scores * weights['keywords'] + weights['education'])
+        if semantic:
+            bounds = bounds + weights.get('semantic', 0.0)
+        # Headroom for rounding differences against the vectorized scorer
+        return ids, np.round(bounds * 100 + 1e-6, 2)
+
+    def _count(self, db):
+        return db.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def _load(self, db, doc_ids, column):
+        """{doc_id: decoded column} for the given documents"""
+        rows = self._select(db, f'SELECT doc_id, {column} FROM documents '
+                                'WHERE doc_id IN ({placeholders})', doc_ids)
+        return {doc_id: json.loads(value) for doc_id, value in rows}
+
+    def _score(self, db, doc_ids, matcher, job_requirements, job_vector, vector_index):
+        """Scoring records and scores of the given documents, from their features alone"""
+        features_by_id = self._load(db, doc_ids, 'features')
+        resume_list = [ParsedResume.from_dict(features_by_id[doc_id]) for doc_id in doc_ids]
+        features = ResumeFeatures(resume_list)
+        if vector_index is not None and resume_list:
+            # Precomputed vectors where available; resumes added since the build are embedded now
+            vectors = vector_index.lookup(doc_ids)
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            if missing:
+                stored = self._load(db, [doc_ids[i] for i in missing], 'data')
+                embedded = matcher.semantic_model.embed([stored[doc_ids[i]].get('raw_text', '')
+                                                         for i in missing])
+                for i, vector in zip(missing, embedded):
+                    vectors[i] = vector
+            features.semantic_vectors = np.vstack(vectors)
+        with metrics.stage('scoring'):
+            scores = matcher.score_batch(features, job_requirements, job_vector)
+        return resume_list, scores
+
+    def _prune(self, db, doc_ids, bounds, matcher, job_requirements, job_vector, vector_index, top_k):
+        """Documents that can reach the top_k: scored in descending bound order until
+        the next bound is below the top_k-th score (strictly, as ties keep doc_id order)"""
+        order = np.lexsort((doc_ids, -bounds))
+        ranked, bounds = doc_ids[order].tolist(), bounds[order].tolist()
+        batch = max(SEARCH_BATCH, top_k)
+        best = []
+        position = 0
+        while position < len(ranked):
+            chunk = ranked[position:position + batch]
+            position += len(chunk)
+            resume_list, scores = self._score(db, chunk, matcher, job_requirements,
+                                              job_vector, vector_index)
+            best = sorted(best + [round(score * 100, 2) for score in scores['overall'].tolist()],
+                          reverse=True)[:top_k]
+            if len(best) == top_k and position < len(ranked) and bounds[position] < best[-1]:
+                break
+        return ranked[:position]
+
+    def search(self, job_description, top_k=10, matcher=None):
+        """Top-k resumes for a job description, scoring only documents that could make the top_k"""
+        matcher = matcher or shared_matcher()
+        job_requirements = matcher.get_job_requirements(job_description)
+        job_vector = matcher.get_job_vector(job_description)
+        vector_index = get_vector_index() if job_vector is not None else None
+
+        with self._lock:
+            db = self._connect()
+            # Every document sharing a job term; the nearest precomputed vectors
+            # add resumes sharing no literal terms
+            doc_ids, bounds = self._upper_bounds(db, matcher, job_requirements, job_vector is not None)
+            if vector_index is not None:
+                # Always scored; their semantic score is what brought them in
+                nearest = np.setdiff1d(np.asarray(vector_index.top_k(job_vector, SEMANTIC_CANDIDATES)[0],
+                                                  dtype=np.int64), doc_ids)
+                doc_ids = np.concatenate((doc_ids, nearest))
+                bounds = np.concatenate((bounds, np.full(len(nearest), np.inf)))
+
+            if top_k is not None and len(doc_ids) > top_k:
+                doc_ids = self._prune(db, doc_ids, bounds, matcher, job_requirements, job_vector,
+                                      vector_index, top_k)
+            else:
+                doc_ids = doc_ids.tolist()
+
+            # The survivors are scored together in doc_id order, like a full scan
+            doc_ids = sorted(doc_ids)
+            resume_list, scores = self._score(db, doc_ids, matcher, job_requirements,
+                                              job_vector, vector_index)
+
+            # Match records echo the stored resume, loaded for the returned ones only
+            order = matcher.rank_order([round(score * 100, 2) for score in scores['overall'].tolist()],
+                                       top_k)
+            stored = self._load(db, [doc_ids[i] for i in order], 'data')
+            total = self._count(db)
+        for i in order:
+            resume_list[i] = ParsedResume.from_dict(stored[doc_ids[i]])
+
+        matches = []
+        if resume_list:
+            order, matches = matcher.rank_scores(resume_list, job_requirements, scores, top_k)
+            for i, match_result in zip(order, matches):
+                match_result['resume_id'] = doc_ids[i]
+
+        return {
+            'matches': matches,
+            'job_requirements': job_requirements,
+            'total_resumes': total,
+            'candidates_scored': len(resume_list)
+        }
+
+    def stats(self):
+        """Document and term statistics for the index"""
+        with self._lock:
+            db = self._connect()
+            documents = db.execute('SELECT COUNT(*), COALESCE(AVG(keyword_count), 0) FROM documents').fetchone()
+            terms = dict(db.execute('SELECT kind, COUNT(*) FROM terms GROUP BY kind').fetchall())
+            postings = db.execute('SELECT COUNT(*) FROM postings').fetchone()[0]
+        return {
+            'documents': documents[0],
+            'avg_keywords_per_document': round(documents[1], 2),
+            'keyword_terms': terms.get(KEYWORD, 0),
+            'skill_terms': terms.get(SKILL, 0),
+            'postings': postings
+        }
+
+
+# Process-wide corpus index
+corpus_index = CorpusIndex()
@@ -0,0 +1,147 @@
+import hashlib
+import os
+
+import numpy as np
+
+# Near-duplicate detection (MinHash signatures over word shingles, banded LSH)
+DEDUP_DEFAULT = os.environ.get('DEDUP_DEFAULT', '0') == '1'
+DEDUP_THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD', '0.8'))
+
+SHINGLE_WORDS = 3
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Shingles hashed per numpy pass (documents are grouped up to this many), and the
+# bound on the (permutations x shingles) uint64 work array (8 MB), which a long
+# document meets by hashing fewer permutations at a time
+_CHUNK_SHINGLES = 1 << 16
+_WORK_ELEMENTS = 1 << 20
+
+_rng = np.random.default_rng(20240101)
+# Multiplying by an odd number permutes the 64-bit hashes, one permutation per row
+_PERMUTATIONS = _rng.integers(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+# Per-position multipliers that combine word hashes into a shingle hash
+_SHINGLE_MIX = _rng.integers(1, 2 ** 63, size=SHINGLE_WORDS, dtype=np.uint64) | np.uint64(1)
+
+
+def _shingle_hashes(text):
+    """64-bit hashes of the overlapping SHINGLE_WORDS-word shingles of a text (at least one)"""
+    words = text.lower().split()
+    if not words:
+        words = ['']
+    # Word hashes only need to agree within one call, so the built-in hash will do
+    hashes = np.fromiter(map(hash, words), dtype=np.int64, count=len(words)).view(np.uint64)
+    width = min(SHINGLE_WORDS, len(hashes))
+    count = len(hashes) - width + 1
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        shingles ^= hashes[offset:offset + count] * _SHINGLE_MIX[offset]
+    return shingles
+
+
+def _chunks(texts):
+    """Shingle hashes of consecutive runs of texts, about _CHUNK_SHINGLES at a time; yields (start, hash lists)"""
+    start, chunk, total = 0, [], 0
+    for text in texts:
+        shingles = _shingle_hashes(text)
+        if chunk and total + len(shingles) > _CHUNK_SHINGLES:
+            yield start, chunk
+            start, chunk, total = start + len(chunk), [], 0
+        chunk.append(shingles)
+        total += len(shingles)
+    if chunk:
+        yield start, chunk
+
+
+def minhash_signatures(texts):
+    """MinHash signature of every text, one row of NUM_PERM values per text"""
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint64)
+    for start, shingle_lists in _chunks(texts):
+        stop = start + len(shingle_lists)
+        lengths = np.fromiter((len(shingles) for shingles in shingle_lists), dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        shingles = np.concatenate(shingle_lists)
+        step = max(1, _WORK_ELEMENTS // len(shingles))
+        for first in range(0, NUM_PERM, step):
+            hashed = _PERMUTATIONS[first:first + step, None] * shingles[None, :]
+            signatures[start:stop, first:first + step] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return signatures
+
+
+def find_duplicates(texts, threshold=None):
+    """Cluster exact and near-duplicate texts; returns index lists, each led by its first occurrence"""
+    threshold = DEDUP_THRESHOLD if threshold is None else threshold
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        i, j = find(i), find(j)
+        if i != j:
+            # The earlier document stays the representative
+            parent[max(i, j)] = min(i, j)
+
+    # Exact duplicates (ignoring case and whitespace) are merged without hashing
+    first_seen = {}
+    distinct = []
+    for i, text in enumerate(texts):
+        digest = hashlib.sha1(' '.join(text.lower().split()).encode('utf-8', errors='surrogatepass')).digest()
+        if digest in first_seen:
+            union(first_seen[digest], i)
+        else:
+            first_seen[digest] = i
+            distinct.append(i)
+
+    if len(distinct) > 1 and threshold < 1:
+        signatures = minhash_signatures([texts[i] for i in distinct])
+
+        # Documents sharing any band are candidates; the signature agreement
+        # estimates their Jaccard similarity
+        checked = set()
+        for band in range(BANDS):
+            buckets = {}
+            rows = signatures[:, band * ROWS:(band + 1) * ROWS]
+            for position, key in enumerate(map(bytes, rows)):
+                buckets.setdefault(key, []).append(position)
+            for members in buckets.values():
+                for other in members[1:]:
+                    pair = (members[0], other)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    if np.mean(signatures[members[0]] == signatures[other]) >= threshold:
+                        union(distinct[members[0]], distinct[other])
+
+    clusters = {}
+    for i in range(len(texts)):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values())
+
+
+def collapse_duplicates(resume_data):
+    """Keep the first of each cluster of near-duplicate parsed resumes (by extracted text); returns (resume_data, duplicates)"""
+    duplicates = {}
+    if not resume_data:
+        return resume_data, duplicates
+    clusters = find_duplicates([parsed_data.get('raw_text', '') for parsed_data in resume_data])
+    for cluster in clusters:
+        if len(cluster) > 1:
+            duplicates[resume_data[cluster[0]]['filename']] = [resume_data[i]['filename'] for i in cluster[1:]]
+    return [resume_data[cluster[0]] for cluster in clusters], duplicates
+
+
+def attach_duplicates(matches, duplicates):
+    """Copies of match records with the filenames of their duplicates (keyed by representative filename)"""
+    attached = []
+    for match_result in matches:
+        members = duplicates.get(match_result.get('filename'))
+        if members:
+            match_result = dict(match_result)
+            match_result['duplicates'] = members
+        attached.append(match_result)
+    return attached
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+
+from utils.streaming import NDJSON_MIMETYPE
+
+CSV_MIMETYPE = 'text/csv'
+
+EXPORT_FORMATS = {'csv': CSV_MIMETYPE, 'ndjson': NDJSON_MIMETYPE}
+
+# Exportable columns: fields of the match record, then fields of the parsed resume
+MATCH_COLUMNS = ('rank', 'filename', 'resume_id', 'overall_score', 'skill_score', 'experience_score',
+                 'keyword_score', 'education_score', 'semantic_score', 'matched_skills', 'missing_skills',
+                 'feedback', 'duplicates')
+RESUME_COLUMNS = ('email', 'phone', 'experience_years', 'skills', 'education')
+EXPORT_COLUMNS = MATCH_COLUMNS + RESUME_COLUMNS
+
+# Same columns as the CSV download on the results page
+DEFAULT_COLUMNS = ('rank', 'filename', 'overall_score', 'skill_score', 'experience_score',
+                   'keyword_score', 'education_score', 'matched_skills', 'missing_skills')
+
+# Rows are written to the response in chunks of this many
+EXPORT_CHUNK_ROWS = 256
+
+
+def export_columns(columns=None):
+    """Validated export columns (a list or comma-separated string); raises ValueError"""
+    if columns is None:
+        return DEFAULT_COLUMNS
+    if isinstance(columns, str):
+        columns = [name.strip() for name in columns.split(',') if name.strip()]
+    elif not isinstance(columns, (list, tuple)):
+        raise ValueError("columns must be a list or a comma-separated string")
+    if columns == ['all']:
+        return EXPORT_COLUMNS
+    unknown = [name for name in columns if name not in EXPORT_COLUMNS]
+    if unknown or not columns:
+        raise ValueError(f"Unknown export columns: {', '.join(map(str, unknown)) or '(none given)'} "
+                         f"(choose from {', '.join(EXPORT_COLUMNS)})")
+    return tuple(columns)
+
+
+def export_format(request, data):
+    """Export format from the request body, query string or Accept header; raises ValueError"""
+    name = data.get('format') or request.args.get('format')
+    if not name:
+        return 'ndjson' if NDJSON_MIMETYPE in request.headers.get('Accept', '') else 'csv'
+    name = str(name).lower()
+    if name not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    return name
+
+
+def iter_export_rows(matches, columns):
+    """One dict of the selected columns per ranked match"""
+    for match_result in matches:
+        resume_data = match_result.get('resume_data') or {}
+        yield {column: resume_data.get(column) if column in RESUME_COLUMNS else match_result.get(column)
+               for column in columns}
+
+
+def _csv_value(value):
+    """Spreadsheet-friendly cell: lists are joined, missing values left empty"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ', '.join(map(str, value))
+    return value
+
+
+def iter_csv(rows, columns):
+    """Serialize rows as CSV with a header line, a chunk of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(row[column]) for column in columns])
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson_rows(rows):
+    """Serialize rows as newline-delimited JSON, a chunk of rows at a time"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row) + '\n')
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def iter_export(matches, columns, fmt):
+    """Stream ranked matches in the given export format without building the whole file"""
+    rows = iter_export_rows(matches, columns)
+    if fmt == 'csv':
+        return iter_csv(rows, columns)
+    return iter_ndjson_rows(rows)
@@ -0,0 +1,390 @@
+import io
+import os
+import sys
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from xml.parsers import expat
+
+# Backend selection: a registered name, or 'auto' for the fastest available one
+PDF_BACKEND = os.environ.get('PDF_BACKEND', 'auto')
+
+# Extraction stops early after this many pages / characters (0 disables a cap)
+PDF_MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', '30'))
+PDF_MAX_CHARS = int(os.environ.get('PDF_MAX_CHARS', '200000'))
+
+# DOCX extraction stops early after this many characters (0 disables the cap)
+DOCX_MAX_CHARS = int(os.environ.get('DOCX_MAX_CHARS', '200000'))
+
+# word/document.xml is decompressed and parsed this many bytes at a time
+DOCX_CHUNK_BYTES = 64 * 1024
+
+# Without measurements, 'auto' prefers backends in this order
+BACKEND_PREFERENCE = ['pymupdf', 'pdfium', 'pypdf2']
+
+# 'auto' extracts this many documents with every available backend before picking by speed
+PDF_AUTO_SAMPLE_DOCUMENTS = int(os.environ.get('PDF_AUTO_SAMPLE_DOCUMENTS', '3'))
+
+
+class PDFBackend(ABC):
+    """Common interface for PDF text extraction libraries"""
+    name = None
+
+    @classmethod
+    def available(cls):
+        """True if the backing library can be imported"""
+        return False
+
+    @abstractmethod
+    def open(self, stream):
+        """Open a document from a binary stream"""
+
+    @abstractmethod
+    def page_count(self, document):
+        """Number of pages in an open document"""
+
+    @abstractmethod
+    def page_text(self, document, index):
+        """Text of one page"""
+
+
+_backends = {}
+
+
+def register_backend(backend_class):
+    """Register a PDFBackend subclass under its name"""
+    _backends[backend_class.name] = backend_class
+    return backend_class
+
+
+@register_backend
+class PyPDF2Backend(PDFBackend):
+    name = 'pypdf2'
+
+    @classmethod
+    def available(cls):
+        try:
+            import PyPDF2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def open(self, stream):
+        import PyPDF2
+        return PyPDF2.PdfReader(stream)
+
+    def page_count(self, document):
+        return len(document.pages)
+
+    def page_text(self, document, index):
+        return document.pages[index].extract_text()
+
+
+@register_backend
+class PdfiumBackend(PDFBackend):
+    name = 'pdfium'
+
+    @classmethod
+    def available(cls):
+        try:
+            import pypdfium2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def open(self, stream):
+        import pypdfium2
+        return pypdfium2.PdfDocument(stream.read())
+
+    def page_count(self, document):
+        return len(document)
+
+    def page_text(self, document, index):
+        page = document[index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range()
+        finally:
+            textpage.close()
+            page.close()
+
+
+def _import_pymupdf():
+    """Import PyMuPDF under its current name, falling back to the legacy 'fitz'"""
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf
+    return pymupdf
+
+
+@register_backend
+class PyMuPDFBackend(PDFBackend):
+    name = 'pymupdf'
+
+    @classmethod
+    def available(cls):
+        try:
+            _import_pymupdf()
+            return True
+        except ImportError:
+            return False
+
+    def open(self, stream):
+        return _import_pymupdf().open(stream=stream.read(), filetype='pdf')
+
+    def page_count(self, document):
+        return document.page_count
+
+    def page_text(self, document, index):
+        return document[index].get_text()
+
+
+# Per-backend timings known to this process, and the share of them recorded here
+# that has not been exported yet (pool workers hand theirs back with every result)
+_timings = {}
+_unreported = {}
+_timings_lock = threading.Lock()
+
+# Backend instances, created once per name
+_instances = {}
+
+
+def _add_timing(timings, name, documents, pages, seconds):
+    """Add to a backend's totals (caller holds the lock)"""
+    timing = timings.setdefault(name, {'documents': 0, 'pages': 0, 'seconds': 0.0})
+    timing['documents'] += documents
+    timing['pages'] += pages
+    timing['seconds'] += seconds
+
+
+def record_timing(name, pages, seconds):
+    """Accumulate extraction time for a backend"""
+    with _timings_lock:
+        _add_timing(_timings, name, 1, pages, seconds)
+        _add_timing(_unreported, name, 1, pages, seconds)
+
+
+def export_timings():
+    """Timings recorded since the last export, for handing back from a worker process"""
+    global _unreported
+    with _timings_lock:
+        collected, _unreported = _unreported, {}
+    return collected or None
+
+
+def merge_timings(collected):
+    """Add timings exported by a worker to this process"""
+    if not collected:
+        return
+    with _timings_lock:
+        for name, timing in collected.items():
+            _add_timing(_timings, name, timing['documents'], timing['pages'], timing['seconds'])
+
+
+def timings_snapshot():
+    """Copy of every timing known to this process, for handing to a worker"""
+    with _timings_lock:
+        return {name: dict(timing) for name, timing in _timings.items()}
+
+
+def load_timings(snapshot):
+    """Adopt the parent's timings in a worker, so 'auto' picks from every worker's measurements"""
+    global _timings
+    with _timings_lock:
+        _timings = {name: dict(timing) for name, timing in snapshot.items()}
+
+
+def available_backends():
+    """Names of registered backends whose libraries are installed"""
+    return [name for name, backend_class in _backends.items() if backend_class.available()]
+
+
+def _fastest_backend(names):
+    """Available backend with the lowest measured time per page, once every one has been sampled"""
+    with _timings_lock:
+        sampled = {name: _timings[name]['documents'] for name in names if name in _timings}
+        measured = {name: timing['seconds'] / timing['pages']
+                    for name, timing in _timings.items()
+                    if name in names and timing['pages']}
+    preferred = sorted(names, key=lambda name: (BACKEND_PREFERENCE.index(name)
+                                                if name in BACKEND_PREFERENCE else len(BACKEND_PREFERENCE)))
+    # Try each backend on a few documents first, or the first one measured would always win
+    for name in preferred:
+        if sampled.get(name, 0) < PDF_AUTO_SAMPLE_DOCUMENTS:
+            return name
+    if measured:
+        return min(measured, key=measured.get)
+    return preferred[0]
+
+
+def get_backend(name=None):
+    """Return a backend instance by name, or the configured/fastest one"""
+    name = name or PDF_BACKEND
+    if name == 'auto':
+        names = available_backends()
+        if not names:
+            raise Exception("No PDF backend available")
+        name = _fastest_backend(names)
+
+    backend = _instances.get(name)
+    if backend is None:
+        backend_class = _backends.get(name)
+        if backend_class is None or not backend_class.available():
+            raise Exception(f"PDF backend not available: {name}")
+        backend = _instances[name] = backend_class()
+    return backend
+
+
+def iter_pdf_pages(source, backend=None, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS):
+    """Lazily yield page texts from a PDF path, file-like object or bytes"""
+    backend = get_backend(backend)
+    owns_stream = not hasattr(source, 'read')
+    if isinstance(source, str):
+        stream = open(source, 'rb')
+    elif owns_stream:
+        stream = io.BytesIO(source)
+    else:
+        stream = source
+
+    started = time.perf_counter()
+    pages = 0
+    try:
+        document = backend.open(stream)
+        total = backend.page_count(document)
+        limit = min(total, max_pages) if max_pages else total
+
+        chars = 0
+        for index in range(limit):
+            text = backend.page_text(document, index) or ''
+            pages += 1
+            chars += len(text)
+            yield text
+            if max_chars and chars >= max_chars:
+                break
+    finally:
+        record_timing(backend.name, pages, time.perf_counter() - started)
+        if owns_stream:
+            stream.close()
+
+
+# WordprocessingML (transitional and strict) and markup-compatibility namespaces
+_WORD_NAMESPACES = frozenset(['http://schemas.openxmlformats.org/wordprocessingml/2006/main',
+                              'http://purl.oclc.org/ooxml/wordprocessingml/main'])
+_MC_NAMESPACE = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+
+# Run elements other than w:t that python-docx renders as characters
+_RUN_CHARACTERS = {'tab': '\t', 'br': '\n', 'cr': '\n', 'noBreakHyphen': '-'}
+
+
+class _DocxText:
+    """expat handlers collecting paragraph texts from word/document.xml"""
+
+    def __init__(self):
+        self.paragraphs = []  # finished paragraphs, in document order
+        self._open = []       # text parts of open paragraphs (text boxes nest them)
+        self._runs = 0
+        self._in_text = False
+        self._skipped = 0     # depth inside an mc:Fallback, which repeats its mc:Choice
+
+    def start(self, name, attributes):
+        namespace, _, tag = name.rpartition(' ')
+        if self._skipped or (namespace == _MC_NAMESPACE and tag == 'Fallback'):
+            self._skipped += 1
+        elif namespace in _WORD_NAMESPACES:
+            if tag == 'p':
+                self._open.append([])
+            elif tag == 'r':
+                self._runs += 1
+            elif tag == 't':
+                self._in_text = True
+            elif self._runs and self._open and tag in _RUN_CHARACTERS:
+                # Only inside runs: paragraph properties define tab stops as w:tab too
+                self._open[-1].append(_RUN_CHARACTERS[tag])
+
+    def end(self, name):
+        if self._skipped:
+            self._skipped -= 1
+            return
+        namespace, _, tag = name.rpartition(' ')
+        if namespace in _WORD_NAMESPACES:
+            if tag == 'p' and self._open:
+                self.paragraphs.append(''.join(self._open.pop()))
+            elif tag == 'r':
+                self._runs -= 1
+            elif tag == 't':
+                self._in_text = False
+
+    def characters(self, data):
+        if self._in_text and self._open and not self._skipped:
+            self._open[-1].append(data)
+
+
+def _reject_doctype(*args):
+    raise ValueError("DOCX document.xml must not declare a DTD")
+
+
+def iter_docx_paragraphs(source, max_chars=DOCX_MAX_CHARS):
+    """Lazily yield paragraph texts (table cells and hyperlinks included) in document order from a DOCX"""
+    # No object model is built: word/document.xml is streamed through expat
+    handler = _DocxText()
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.characters
+    parser.StartDoctypeDeclHandler = _reject_doctype
+    parser.buffer_text = True
+
+    chars = 0
+    with zipfile.ZipFile(source) as archive, archive.open('word/document.xml') as document:
+        while True:
+            chunk = document.read(DOCX_CHUNK_BYTES)
+            parser.Parse(chunk, not chunk)
+            paragraphs = handler.paragraphs
+            handler.paragraphs = []
+            for paragraph in paragraphs:
+                chars += len(paragraph) + 1
+                yield paragraph
+                if max_chars and chars >= max_chars:
+                    return
+            if not chunk:
+                return
+
+
+def extractor_stats():
+    """Available backends, the current choice and per-backend timings"""
+    with _timings_lock:
+        timings = {name: dict(timing,
+                              ms_per_page=round(timing['seconds'] * 1000 / timing['pages'], 3)
+                              if timing['pages'] else None)
+                   for name, timing in _timings.items()}
+    names = available_backends()
+    return {
+        'configured': PDF_BACKEND,
+        'selected': get_backend().name if names else None,
+        'available': names,
+        'limits': {'max_pages': PDF_MAX_PAGES, 'max_chars': PDF_MAX_CHARS,
+                   'auto_sample_documents': PDF_AUTO_SAMPLE_DOCUMENTS, 'docx_max_chars': DOCX_MAX_CHARS},
+        'timings': timings
+    }
+
+
+def benchmark_backends(paths, repeat=3):
+    """Time every available backend on sample PDFs; returns ms per page by backend"""
+    results = {}
+    for name in available_backends():
+        pages = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for path in paths:
+                pages += sum(1 for _ in iter_pdf_pages(path, backend=name, max_pages=0, max_chars=0))
+        elapsed = time.perf_counter() - started
+        results[name] = round(elapsed * 1000 / pages, 3) if pages else None
+    return results
+
+
+if __name__ == "__main__":
+    # Compare backends at deploy time: python -m utils.extractors sample1.pdf [sample2.pdf ...]
+    for name, ms_per_page in sorted(benchmark_backends(sys.argv[1:]).items(), key=lambda item: item[1] or 0):
+        print(f"{name}: {ms_per_page} ms/page")
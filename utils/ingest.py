@@ -0,0 +1,361 @@
+import itertools
+import math
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+
+from utils import extractors, metrics
+from utils.cache import content_key, file_key, parse_cache
+from utils.resume_parser import ParsedResume, ResumeParser
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; memory budgets are skipped there
+    resource = None
+
+# Pool configuration (INGEST_MAX_WORKERS=0 disables the pool entirely)
+MAX_WORKERS = int(os.environ.get('INGEST_MAX_WORKERS', str(os.cpu_count() or 1)))
+FILE_TIMEOUT = float(os.environ.get('INGEST_FILE_TIMEOUT', '30'))
+FILE_MEMORY_MB = int(os.environ.get('INGEST_FILE_MEMORY_MB', '1024'))
+
+# Text batches smaller than this are parsed in-process, where the pool does not pay
+# off; files always go to the pool so every upload gets the wall-clock and memory budget
+TEXT_PARALLEL_THRESHOLD = int(os.environ.get('INGEST_TEXT_PARALLEL_THRESHOLD', '64'))
+
+# Uploads larger than this are spilled to a temp file instead of being held in memory
+SPILL_BYTES = int(os.environ.get('INGEST_SPILL_BYTES', str(4 * 1024 * 1024)))
+
+# How long the request waits past the in-worker timeout before giving up on a worker
+TIMEOUT_GRACE = 5.0
+
+
+# BaseException so the parser's own ``except Exception`` wrappers don't swallow it
+class ParseTimeout(BaseException):
+    """Raised inside a worker when a file exceeds its wall-clock budget"""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_disabled = False
+
+# Worker process running each in-flight task (task id -> pid, None until it starts),
+# so a stuck worker can be killed without touching other requests' tasks
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+_task_ids = itertools.count()
+
+# Parser instance owned by each worker process
+_worker_parser = None
+
+# Queue each worker reports (task id, pid) on when it starts a task
+_started = None
+
+# Parser instance for in-process parsing in the web process
+_local_parser = None
+
+# Set when the wall-clock alarm fires, in case something swallows the ParseTimeout
+_alarm_fired = False
+
+
+def _init_worker(memory_mb, started=None):
+    """Set up a pool worker: memory budget, start reports and a reusable parser"""
+    global _worker_parser, _started
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        try:
+            soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        except (ValueError, OSError):
+            pass
+
+    _started = started
+    _worker_parser = ResumeParser()
+
+
+def _on_alarm(signum, frame):
+    global _alarm_fired
+    _alarm_fired = True
+    raise ParseTimeout()
+
+
+def _run_task(parser, kind, source, filename):
+    """Parse one file (path or bytes) or one text"""
+    if kind == 'file':
+        return parser.parse_resume(source, filename)
+    return parser.parse_text(source)
+
+
+def _parse_one(parser, task, use_alarm):
+    """Parse one file or text; returns (parsed_data, error)"""
+    global _alarm_fired
+    kind, source, filename, timeout = task
+
+    # An interval timer can interrupt a pathological file without killing the
+    # process, but signals are only delivered on the main thread
+    use_alarm = use_alarm and bool(timeout) and hasattr(signal, 'setitimer')
+    _alarm_fired = False
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = _run_task(parser, kind, source, filename), None
+    except ParseTimeout:
+        result = None, f"Timed out after {timeout:g}s"
+    except MemoryError:
+        result = None, "Exceeded memory budget"
+    except Exception as e:
+        result = None, str(e)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    # A parse the alarm interrupted is partial even if it returned; report it as
+    # timed out so it never reaches the parse cache
+    if _alarm_fired and result[1] is None:
+        result = None, f"Timed out after {timeout:g}s"
+    return result
+
+
+def _parse_in_worker(task, task_id=None, deadline=None, backend_timings=None):
+    """Parse one file or text inside a worker, enforcing the wall-clock budget"""
+    if deadline is not None and time.time() > deadline:
+        # The request already gave up on this task while it sat in the queue
+        return None, f"Timed out after {task[3]:g}s", None, None
+    if backend_timings is not None:
+        extractors.load_timings(backend_timings)
+    if _started is not None and task_id is not None:
+        _started.put((task_id, os.getpid()))
+
+    parser = _worker_parser or ResumeParser()
+
+    # Stage timings are sent back with the result, to be merged into the request
+    collecting = metrics.start_collecting() if metrics.METRICS_ENABLED else None
+
+    # Workers run tasks on their main thread, so the alarm always applies
+    result = _parse_one(parser, task, use_alarm=True)
+
+    collected = None
+    if collecting is not None:
+        timings, token = collecting
+        collected = metrics.stop_collecting(token, fold=False).export()
+
+    # PDF backend timings go back too, so the web process learns which backend is fastest
+    return result + (collected, extractors.export_timings())
+
+
+def _get_local_parser():
+    """Parser used for in-process parsing, created once"""
+    global _local_parser
+    if _local_parser is None:
+        _local_parser = ResumeParser()
+    return _local_parser
+
+
+def _parse_serial(tasks):
+    """Parse tasks in the current process (timed out only on the main thread, no memory budget)"""
+    parser = _get_local_parser()
+    use_alarm = threading.current_thread() is threading.main_thread()
+    return [_parse_one(parser, task, use_alarm) for task in tasks]
+
+
+def _watch_started(started):
+    """Record which worker picked up each in-flight task (runs on a daemon thread)"""
+    while True:
+        try:
+            task_id, pid = started.get()
+        except (EOFError, OSError):
+            return
+        with _in_flight_lock:
+            # Tasks whose batch already finished are no longer tracked
+            if task_id in _in_flight:
+                _in_flight[task_id] = pid
+
+
+def _get_pool():
+    """Return the shared worker pool, creating it on first use"""
+    global _pool, _pool_disabled
+    with _pool_lock:
+        if _pool is None and not _pool_disabled and MAX_WORKERS > 0:
+            try:
+                started = multiprocessing.SimpleQueue()
+                _pool = multiprocessing.Pool(MAX_WORKERS, initializer=_init_worker,
+                                             initargs=(FILE_MEMORY_MB, started))
+            except (OSError, ImportError, ValueError):
+                # Some serverless sandboxes do not allow worker processes
+                _pool_disabled = True
+            else:
+                threading.Thread(target=_watch_started, args=(started,), daemon=True).start()
+        return _pool
+
+
+def _kill_stuck(task_ids, pending):
+    """Kill the workers still running these tasks; the pool replaces them with fresh ones"""
+    with _in_flight_lock:
+        pids = {_in_flight.get(task_id) for task_id, async_result in zip(task_ids, pending)
+                if not async_result.ready()}
+    pids.discard(None)
+    for pid in pids:
+        try:
+            os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        except OSError:
+            pass
+
+
+def _parse_batch(tasks, threshold):
+    """Parse tasks, in the worker pool when the batch is large enough"""
+    pool = _get_pool() if len(tasks) >= threshold else None
+    if pool is None:
+        return _parse_serial(tasks)
+
+    # Backstop for workers stuck where the in-worker alarm cannot fire
+    # (C extensions, OOM-killed processes); the deadline is this request's alone
+    deadline = worker_deadline = None
+    if FILE_TIMEOUT:
+        rounds = math.ceil(len(tasks) / MAX_WORKERS)
+        budget = rounds * FILE_TIMEOUT + TIMEOUT_GRACE
+        deadline = time.monotonic() + budget
+        worker_deadline = time.time() + budget
+
+    # Workers choose the 'auto' PDF backend from every worker's measurements
+    backend_timings = extractors.timings_snapshot() if tasks[0][0] == 'file' else None
+
+    task_ids = [next(_task_ids) for task in tasks]
+    with _in_flight_lock:
+        _in_flight.update(dict.fromkeys(task_ids))
+    pending = [pool.apply_async(_parse_in_worker, (task, task_id, worker_deadline, backend_timings))
+               for task, task_id in zip(tasks, task_ids)]
+
+    results = []
+    stuck = False
+    try:
+        for async_result in pending:
+            if stuck and not async_result.ready():
+                results.append((None, f"Timed out after {FILE_TIMEOUT:g}s"))
+                continue
+            try:
+                timeout = None if deadline is None else max(0, deadline - time.monotonic())
+                parsed_data, error, collected, worker_timings = async_result.get(timeout=timeout)
+                metrics.merge(collected)
+                extractors.merge_timings(worker_timings)
+                results.append((parsed_data, error))
+            except multiprocessing.TimeoutError:
+                stuck = True
+                results.append((None, f"Timed out after {FILE_TIMEOUT:g}s"))
+            except Exception as e:
+                results.append((None, str(e)))
+
+        if stuck:
+            _kill_stuck(task_ids, pending)
+    finally:
+        with _in_flight_lock:
+            for task_id in task_ids:
+                _in_flight.pop(task_id, None)
+
+    return results
+
+
+def _parse_cached(tasks, keys, threshold):
+    """Serve tasks from the parse cache, parsing and caching only the misses (None keys bypass the cache)"""
+    results = [None] * len(tasks)
+    missing = []
+    for i, key in enumerate(keys):
+        cached = parse_cache.get(key) if key is not None else None
+        if cached is not None:
+            results[i] = (cached, None)
+        else:
+            missing.append(i)
+
+    if missing:
+        parsed = _parse_batch([tasks[i] for i in missing], threshold)
+        for i, (parsed_data, error) in zip(missing, parsed):
+            if error is None and keys[i] is not None:
+                parse_cache.put(keys[i], parsed_data)
+            results[i] = (parsed_data, error)
+
+    # Tag each record with its source's key, which identifies it to the results cache
+    for key, (parsed_data, error) in zip(keys, results):
+        if key is not None and isinstance(parsed_data, ParsedResume):
+            parsed_data.content_key = key
+
+    return results
+
+
+def _text_key(text):
+    """Parse-cache key for a submitted text; None for non-text items, which are
+    parsed uncached so they fail on their own instead of failing the batch"""
+    if isinstance(text, (str, bytes)):
+        return content_key(text)
+    return None
+
+
+def parse_files(files):
+    """Parse (filename, path) pairs; returns (filename, parsed_data, error) triples"""
+    tasks = [('file', path, filename, FILE_TIMEOUT) for filename, path in files]
+    keys = [file_key(path) for filename, path in files]
+    results = _parse_cached(tasks, keys, 1)
+    return [(filename, parsed_data, error)
+            for (filename, path), (parsed_data, error) in zip(files, results)]
+
+
+def parse_streams(uploads, spill_dir):
+    """Parse (filename, stream) uploads without touching disk unless they are large"""
+    tasks = []
+    keys = []
+    spilled = []
+    try:
+        for filename, stream in uploads:
+            ext = os.path.splitext(filename)[1].lower()
+            data = stream.read(SPILL_BYTES + 1)
+            if len(data) <= SPILL_BYTES:
+                tasks.append(('file', data, filename, FILE_TIMEOUT))
+                keys.append(content_key(data, kind=ext or 'file'))
+                continue
+
+            # Large upload: spill to a uniquely named file and hand workers the path
+            with tempfile.NamedTemporaryFile(dir=spill_dir, suffix=ext, delete=False) as file:
+                spilled.append(file.name)
+                file.write(data)
+                shutil.copyfileobj(stream, file)
+            tasks.append(('file', file.name, filename, FILE_TIMEOUT))
+            keys.append(file_key(file.name))
+
+        results = _parse_cached(tasks, keys, 1)
+    finally:
+        for filepath in spilled:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+    return [(filename, parsed_data, error)
+            for (filename, stream), (parsed_data, error) in zip(uploads, results)]
+
+
+def parse_texts(texts):
+    """Parse resume texts; returns (parsed_data, error) pairs in input order"""
+    tasks = [('text', text, None, FILE_TIMEOUT) for text in texts]
+    keys = [_text_key(text) for text in texts]
+    return _parse_cached(tasks, keys, TEXT_PARALLEL_THRESHOLD)
+
+
+def iter_parse_texts(texts):
+    """Yield (parsed_data, error) for each text as soon as it is parsed, in input order"""
+    if len(texts) >= TEXT_PARALLEL_THRESHOLD and _get_pool() is not None:
+        # Feed the pool a window at a time so results stream out with bounded memory
+        window, threshold = max(MAX_WORKERS * 4, 1), 1
+    else:
+        window, threshold = 1, float('inf')
+
+    for start in range(0, len(texts), window):
+        chunk = texts[start:start + window]
+        tasks = [('text', text, None, FILE_TIMEOUT) for text in chunk]
+        keys = [_text_key(text) for text in chunk]
+        yield from _parse_cached(tasks, keys, threshold)
@@ -0,0 +1,304 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from utils.dedup import attach_duplicates, collapse_duplicates
+from utils.ingest import parse_files, parse_texts, MAX_WORKERS
+from utils.matcher import project_results, shared_matcher
+
+# Queue configuration
+JOBS_DB_PATH = os.environ.get('JOBS_DB_PATH', '/tmp/resume_jobs/jobs.sqlite3')
+JOBS_SPOOL_DIR = os.environ.get('JOBS_SPOOL_DIR', '/tmp/resume_jobs/spool')
+JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', '2'))
+JOBS_RESULT_TTL = int(os.environ.get('JOBS_RESULT_TTL', '3600'))
+
+# Running jobs whose heartbeat is older than this are assumed orphaned and requeued
+JOBS_STALE_SECONDS = int(os.environ.get('JOBS_STALE_SECONDS', '300'))
+
+# Idle workers poll the queue at this interval (seconds)
+_POLL_INTERVAL = 1.0
+
+# Resumes parsed between progress updates and cancellation checks
+_CHUNK_SIZE = max(MAX_WORKERS * 2, 8)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled"""
+
+
+class JobQueue:
+    def __init__(self, path=JOBS_DB_PATH, spool_dir=JOBS_SPOOL_DIR, workers=JOBS_WORKERS,
+                 result_ttl=JOBS_RESULT_TTL):
+        """Durable job queue in SQLite, processed by background worker threads"""
+        self.path = path
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.result_ttl = result_ttl
+
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+        self._threads = []
+        self._schema_ready = False
+
+    def _connect(self):
+        """Per-thread connection, creating the schema on first use"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30)
+            db.row_factory = sqlite3.Row
+            if not self._schema_ready:
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        stage TEXT,
+                        progress_done INTEGER NOT NULL DEFAULT 0,
+                        progress_total INTEGER NOT NULL DEFAULT 0,
+                        result TEXT,
+                        error TEXT,
+                        created REAL NOT NULL,
+                        started REAL,
+                        finished REAL,
+                        heartbeat REAL,
+                        expires REAL
+                    )
+                ''')
+                db.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)')
+                db.commit()
+                self._schema_ready = True
+            self._local.db = db
+        return db
+
+    def start(self):
+        """Start the background workers once per process"""
+        with self._start_lock:
+            if self._threads or self.workers <= 0:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit_texts(self, job_description, resumes_text, top_k=None, fields=None, scoring=None,
+                     dedupe=False, rerankable=False):
+        """Queue an analysis of resume texts; returns the job id"""
+        payload = {'job_description': job_description, 'resumes': resumes_text, 'top_k': top_k,
+                   'fields': fields, 'scoring': scoring, 'dedupe': dedupe, 'rerankable': rerankable}
+        return self._submit('analyze', payload, len(resumes_text))
+
+    def submit_files(self, job_description, files, top_k=None, fields=None, scoring=None,
+                     dedupe=False, rerankable=False):
+        """Spool uploaded (filename, FileStorage) pairs and queue their analysis; returns the job id"""
+        job_id = uuid.uuid4().hex
+        spool = os.path.join(self.spool_dir, job_id)
+        os.makedirs(spool, exist_ok=True)
+
+        saved_files = []
+        for i, (filename, file) in enumerate(files):
+            # Prefix with the position so identical names cannot collide
+            filepath = os.path.join(spool, f'{i}_{filename}')
+            file.save(filepath)
+            saved_files.append((filename, filepath))
+
+        payload = {'job_description': job_description, 'files': saved_files, 'top_k': top_k,
+                   'fields': fields, 'scoring': scoring, 'dedupe': dedupe, 'rerankable': rerankable}
+        return self._submit('upload', payload, len(saved_files), job_id)
+
+    def _submit(self, kind, payload, total, job_id=None):
+        """Insert a queued job and wake a worker"""
+        job_id = job_id or uuid.uuid4().hex
+        db = self._connect()
+        with db:
+            db.execute('INSERT INTO jobs (id, kind, status, payload, progress_total, created) '
+                       'VALUES (?, ?, ?, ?, ?, ?)',
+                       (job_id, kind, QUEUED, json.dumps(payload), total, time.time()))
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Job status and progress (without payload or result), or None"""
+        row = self._connect().execute(
+            'SELECT id, kind, status, stage, progress_done, progress_total, error, '
+            'created, started, finished, expires FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None or (row['expires'] and row['expires'] < time.time()):
+            return None
+        return {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'progress': {'done': row['progress_done'], 'total': row['progress_total']},
+            'error': row['error'],
+            'created': row['created'],
+            'started': row['started'],
+            'finished': row['finished'],
+            'expires': row['expires']
+        }
+
+    def result(self, job_id):
+        """Stored results of a finished job, or None"""
+        row = self._connect().execute('SELECT result, expires FROM jobs WHERE id = ? AND status = ?',
+                                      (job_id, DONE)).fetchone()
+        if row is None or row['result'] is None or (row['expires'] and row['expires'] < time.time()):
+            return None
+        return json.loads(row['result'])
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it had already finished"""
+        now = time.time()
+        db = self._connect()
+        with db:
+            updated = db.execute(
+                'UPDATE jobs SET status = ?, finished = ?, expires = ? WHERE id = ? AND status IN (?, ?)',
+                (CANCELLED, now, now + self.result_ttl, job_id, QUEUED, RUNNING)
+            ).rowcount
+        return bool(updated)
+
+    def _claim(self):
+        """Atomically move the oldest queued job to running; returns its row or None"""
+        now = time.time()
+        db = self._connect()
+        with db:
+            # Requeue jobs orphaned by a crashed or restarted process
+            db.execute('UPDATE jobs SET status = ? WHERE status = ? AND heartbeat < ?',
+                       (QUEUED, RUNNING, now - JOBS_STALE_SECONDS))
+            row = db.execute('SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1',
+                             (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            claimed = db.execute(
+                'UPDATE jobs SET status = ?, started = ?, heartbeat = ? WHERE id = ? AND status = ?',
+                (RUNNING, now, now, row['id'], QUEUED)
+            ).rowcount
+        if not claimed:
+            return None
+        return db.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+
+    def _progress(self, job_id, stage, done):
+        """Record progress; raises JobCancelled if the job was cancelled meanwhile"""
+        db = self._connect()
+        with db:
+            db.execute('UPDATE jobs SET stage = ?, progress_done = ?, heartbeat = ? '
+                       'WHERE id = ? AND status = ?', (stage, done, time.time(), job_id, RUNNING))
+            status = db.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if status is None or status['status'] != RUNNING:
+            raise JobCancelled()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        """Store the outcome of a running job"""
+        now = time.time()
+        db = self._connect()
+        with db:
+            db.execute('UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, expires = ? '
+                       'WHERE id = ? AND status = ?',
+                       (status, json.dumps(result) if result is not None else None, error,
+                        now, now + self.result_ttl, job_id, RUNNING))
+
+    def _purge(self):
+        """Drop expired jobs and their spooled files"""
+        db = self._connect()
+        with db:
+            expired = [row['id'] for row in db.execute(
+                'SELECT id FROM jobs WHERE expires IS NOT NULL AND expires < ?', (time.time(),))]
+            db.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in expired])
+        for job_id in expired:
+            shutil.rmtree(os.path.join(self.spool_dir, job_id), ignore_errors=True)
+
+    def _work(self):
+        """Worker loop: claim jobs, run them, purge expired results"""
+        last_purge = 0
+        while True:
+            try:
+                if time.time() - last_purge > 60:
+                    self._purge()
+                    last_purge = time.time()
+
+                job = self._claim()
+                if job is None:
+                    self._wakeup.wait(_POLL_INTERVAL)
+                    self._wakeup.clear()
+                    continue
+                self._run(job)
+            except Exception:
+                # Keep the worker alive through transient database errors
+                time.sleep(_POLL_INTERVAL)
+
+    def _run(self, job):
+        """Parse and match one job, reporting progress as resumes are parsed"""
+        job_id = job['id']
+        payload = json.loads(job['payload'])
+        try:
+            resume_data = []
+            errors = []
+
+            if job['kind'] == 'upload':
+                items = payload['files']
+            else:
+                items = [(f'Resume_{i+1}', text) for i, text in enumerate(payload['resumes'])]
+
+            for start in range(0, len(items), _CHUNK_SIZE):
+                chunk = items[start:start + _CHUNK_SIZE]
+                if job['kind'] == 'upload':
+                    parsed = parse_files(chunk)
+                else:
+                    parsed = [(filename, parsed_data, error) for (filename, text), (parsed_data, error)
+                              in zip(chunk, parse_texts([text for filename, text in chunk]))]
+
+                for filename, parsed_data, error in parsed:
+                    if error:
+                        errors.append({'filename': filename, 'error': error})
+                        continue
+                    parsed_data['filename'] = filename
+                    resume_data.append(parsed_data)
+                self._progress(job_id, 'parsing', start + len(chunk))
+
+            # Near-duplicates (e.g. PDF and DOCX twins) are found on the extracted
+            # text; only the first of each cluster is scored
+            duplicates = {}
+            if payload.get('dedupe'):
+                resume_data, duplicates = collapse_duplicates(resume_data)
+
+            self._progress(job_id, 'matching', len(items))
+            # Weights and min_score resolved at submission; scores are kept for re-ranking on request
+            matcher = shared_matcher(**(payload.get('scoring') or {}))
+            results = matcher.match_resumes(resume_data, payload['job_description'],
+                                            top_k=payload.get('top_k'),
+                                            keep_scores=bool(payload.get('rerankable')))
+            # Stored results only keep the resume fields requested at submission
+            results = project_results(results, payload.get('fields'))
+            if duplicates:
+                results['matches'] = attach_duplicates(results['matches'], duplicates)
+                results['duplicates_removed'] = sum(map(len, duplicates.values()))
+            if errors:
+                results['errors'] = errors
+            self._finish(job_id, DONE, result=results)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self._finish(job_id, FAILED, error=str(e))
+        finally:
+            if job['kind'] == 'upload':
+                shutil.rmtree(os.path.join(self.spool_dir, job_id), ignore_errors=True)
+
+
+# Process-wide job queue; workers start on first submission
+job_queue = JobQueue()
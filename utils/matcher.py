@@ -1,19 +1,48 @@
 import re
+import os
 import math
+import hashlib
 from collections import Counter
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
 import string
+import numpy as np
+from utils import metrics
+from utils.skills import get_skill_matcher
+from utils.resources import get_stopwords
+from utils.tokenizer import TOKENIZER, get_tokenizer
+from utils.cache import LRUCache
+from utils.batch_scoring import ResumeFeatures
+from utils.resume_parser import DEFAULT_RESPONSE_FIELDS
+from utils.score_store import score_store
+from utils.semantic import get_semantic_model, semantic_fingerprint, similarity_scores
 
-class ResumeMatcher:
-    def __init__(self):
-        """Initialize the resume matcher"""
-        try:
-            self.stop_words = set(stopwords.words('english'))
-        except LookupError:
-            # Fallback stopwords if NLTK data not available
-            self.stop_words = set(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 
+# Bump whenever scoring or requirement extraction changes, to invalidate cached results
+SCORING_VERSION = '3'
+
+# Default weights for the overall score
+DEFAULT_WEIGHTS = {
+    'skills': 0.4,      # 40% weight for skills match
+    'experience': 0.25,  # 25% weight for experience
+    'keywords': 0.25,    # 25% weight for keyword similarity
+    'education': 0.1,    # 10% weight for education
+    'semantic': 0.0      # Offline semantic similarity; needs SEMANTIC_MODEL_DIR (set via a scoring profile)
+}
+
+# Process-wide caches shared by every matcher instance
+requirements_cache = LRUCache(int(os.environ.get('REQUIREMENTS_CACHE_SIZE', '256')))
+results_cache = LRUCache(int(os.environ.get('RESULTS_CACHE_SIZE', '32')))
+
+# Shared matchers, one per scoring configuration
+matcher_cache = LRUCache(int(os.environ.get('MATCHER_CACHE_SIZE', '64')))
+
+# Larger rankings are not cached: each entry pins every matched resume, and a
+# few hundred resumes rescore in tens of milliseconds anyway
+RESULTS_CACHE_MAX_RESUMES = int(os.environ.get('RESULTS_CACHE_MAX_RESUMES', '500'))
+
+# Best-fitting jobs listed per resume by match_matrix
+BEST_FIT_JOBS = int(os.environ.get('BEST_FIT_JOBS', '3'))
+
+# Fallback stopwords if NLTK data not available
+FALLBACK_STOP_WORDS = frozenset(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 
                                  'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 
                                  'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 
                                  'itself', 'they', 'them', 'their', 'theirs', 'themselves',
@@ -22,15 +51,105 @@ class ResumeMatcher:
                                  'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
                                  'should', 'could', 'can', 'may', 'might', 'must', 'shall'])
 
+# Years of experience required by a job description (first matching pattern wins)
+EXPERIENCE_PATTERNS = (
+    re.compile(r'(\d+)[\+\s]*years?\s+(?:of\s+)?experience'),
+    re.compile(r'(\d+)[\+\s]*yrs?\s+(?:of\s+)?experience'),
+    re.compile(r'minimum\s+of\s+(\d+)\s+years?'),
+    re.compile(r'at\s+least\s+(\d+)\s+years?'),
+)
+
+EDUCATION_KEYWORDS = ('bachelor', 'master', 'phd', 'degree', 'diploma', 'certification',
+                      'computer science', 'engineering', 'mba', 'graduate')
+
+def job_description_hash(job_description):
+    """Hash of the job description, insensitive to case and whitespace"""
+    normalized = ' '.join(job_description.lower().split())
+    return hashlib.sha256(normalized.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+def resume_fingerprint(resume_data):
+    """Identity of a parsed resume for the results cache: its parse-cache key and
+    filename (everything else in results derives from the source), or None"""
+    content_key = getattr(resume_data, 'content_key', None)
+    if content_key is None:
+        return None
+    return content_key, resume_data.get('filename')
+
+def project_match(match_result, fields=None, text_limit=None):
+    """Copy of a match record whose resume_data holds only the given fields"""
+    match_result = dict(match_result)
+    resume_data = match_result.get('resume_data')
+    if resume_data is not None:
+        projected = {name: resume_data.get(name) for name in fields or DEFAULT_RESPONSE_FIELDS}
+        if text_limit is not None and projected.get('raw_text'):
+            projected['raw_text'] = projected['raw_text'][:text_limit]
+        match_result['resume_data'] = projected
+    return match_result
+
+def project_results(results, fields=None, text_limit=None):
+    """Copy of match results for a response, without the resume fields nobody asked for"""
+    projected = dict(results)
+    projected['matches'] = [project_match(match_result, fields, text_limit)
+                            for match_result in results['matches']]
+    return projected
+
+class ResumeMatcher:
+    def __init__(self, weights=None, min_score=None):
+        """Initialize the resume matcher, optionally with a scoring profile's weights and cut-off"""
+        # Stopwords are loaded once per process (NLTK data, artifact or fallback)
+        self.stop_words = get_stopwords(FALLBACK_STOP_WORDS)
+        
+        # Shared skill taxonomy, built once per process
+        self.skill_matcher = get_skill_matcher()
+        
+        # Scoring configuration; part of every result cache key
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        
+        # Matches scoring below this percentage are left out of rankings
+        self.min_score = min_score
+        
+        # Optional offline semantic model, loaded once per process; resumes are
+        # only embedded when its score counts towards the ranking
+        self.semantic_model = get_semantic_model()
+        self.uses_semantic = self.semantic_model is not None and self.weights.get('semantic', 0.0) > 0
+
+    def config_signature(self):
+        """Identify the scoring code and configuration for cache keys"""
+        weights = ','.join(f'{name}={value!r}' for name, value in sorted(self.weights.items()))
+        return (f'{SCORING_VERSION}:{TOKENIZER}:{self.skill_matcher.fingerprint}:{weights}:{self.min_score!r}:'
+                f'{semantic_fingerprint()}')
+
+    def get_job_requirements(self, job_description):
+        """Return job requirements, memoized on the normalized job description"""
+        key = (job_description_hash(job_description), SCORING_VERSION, TOKENIZER,
+               self.skill_matcher.fingerprint)
+        requirements = requirements_cache.get(key)
+        if requirements is None:
+            with metrics.stage('requirements'):
+                requirements = self.extract_job_requirements(job_description)
+            requirements_cache.put(key, requirements)
+        
+        # Hand out copies so callers cannot modify the cached lists
+        return {name: list(value) if isinstance(value, list) else value
+                for name, value in requirements.items()}
+
+    def get_job_vector(self, job_description, keep_scores=False):
+        """Semantic vector of a job description, or None when the semantic score is not used
+        (unless component scores are kept for re-ranking and a model is configured)"""
+        if not (self.uses_semantic or keep_scores and self.semantic_model is not None):
+            return None
+        return self.semantic_model.job_vector(job_description)
+
     def preprocess_text(self, text):
         """Preprocess text for analysis"""
         if not text:
             return []
         
         try:
-            # Tokenize using NLTK
-            tokens = word_tokenize(text.lower())
-        except:
+            # Tokenize with the configured tokenizer (regex, or NLTK as a fallback)
+            tokenize = get_tokenizer()
+            tokens = tokenize(text.lower())
+        except Exception:
             # Fallback tokenization
             tokens = text.lower().split()
         
@@ -56,48 +175,17 @@ class ResumeMatcher:
         text = job_description.lower()
         
         # Extract years of experience required
-        experience_patterns = [
-            r'(\d+)[\+\s]*years?\s+(?:of\s+)?experience',
-            r'(\d+)[\+\s]*yrs?\s+(?:of\s+)?experience',
-            r'minimum\s+of\s+(\d+)\s+years?',
-            r'at\s+least\s+(\d+)\s+years?'
-        ]
-        
-        for pattern in experience_patterns:
-            matches = re.findall(pattern, text)
+        for pattern in EXPERIENCE_PATTERNS:
+            matches = pattern.findall(text)
             if matches:
                 requirements['experience_required'] = max([int(match) for match in matches])
                 break
         
-        # Extract skills (look for common patterns)
-        skill_patterns = [
-            r'(?:experience with|knowledge of|proficient in|skilled in)\s+([^.]+)',
-            r'(?:requirements?|qualifications?).*?:\s*([^.]+)',
-            r'(?:must have|should have)\s+([^.]+)'
-        ]
-        
-        skills_text = ""
-        for pattern in skill_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            skills_text += " ".join(matches) + " "
-        
-        # Common technical skills to look for
-        tech_skills = ['python', 'java', 'javascript', 'react', 'angular', 'vue', 'django', 
-                      'flask', 'spring', 'nodejs', 'sql', 'mysql', 'postgresql', 'mongodb',
-                      'aws', 'azure', 'docker', 'kubernetes', 'git', 'html', 'css', 'php',
-                      'c++', 'c#', 'ruby', 'go', 'swift', 'kotlin', 'machine learning',
-                      'data science', 'artificial intelligence', 'ai', 'ml', 'tensorflow',
-                      'pytorch', 'pandas', 'numpy', 'scikit-learn']
-        
-        for skill in tech_skills:
-            if skill in text:
-                requirements['required_skills'].append(skill)
+        # Technical skills from the shared taxonomy, matched on word boundaries
+        requirements['required_skills'] = self.skill_matcher.find_all(text)
         
         # Extract education keywords
-        education_keywords = ['bachelor', 'master', 'phd', 'degree', 'diploma', 'certification',
-                            'computer science', 'engineering', 'mba', 'graduate']
-        
-        for keyword in education_keywords:
+        for keyword in EDUCATION_KEYWORDS:
             if keyword in text:
                 requirements['education_keywords'].append(keyword)
         
@@ -183,14 +271,10 @@ class ResumeMatcher:
         
         return matches / len(job_education_keywords)
 
-    def calculate_overall_score(self, skill_score, experience_score, keyword_score, education_score):
+    def calculate_overall_score(self, skill_score, experience_score, keyword_score, education_score,
+                                semantic_score=None):
         """Calculate weighted overall score"""
-        weights = {
-            'skills': 0.4,      # 40% weight for skills match
-            'experience': 0.25,  # 25% weight for experience
-            'keywords': 0.25,    # 25% weight for keyword similarity
-            'education': 0.1     # 10% weight for education
-        }
+        weights = self.weights
         
         overall_score = (
             skill_score * weights['skills'] +
@@ -198,6 +282,9 @@ class ResumeMatcher:
             keyword_score * weights['keywords'] +
             education_score * weights['education']
         )
+        # Added last, so a zero semantic weight leaves the score unchanged
+        if semantic_score is not None:
+            overall_score = overall_score + semantic_score * weights.get('semantic', 0.0)
         
         return round(overall_score * 100, 2)  # Convert to percentage
 
@@ -242,8 +329,8 @@ class ResumeMatcher:
         
         return feedback
 
-    def match_single_resume(self, resume_data, job_requirements):
-        """Match a single resume against job requirements"""
+    def match_single_resume(self, resume_data, job_requirements, job_vector=None):
+        """Match a single resume against job requirements (and the job's semantic vector)"""
         # Calculate individual scores
         skill_score = self.calculate_skill_match(
             resume_data.get('skills', []), 
@@ -265,11 +352,25 @@ class ResumeMatcher:
             job_requirements['education_keywords']
         )
         
+        semantic_score = None
+        if job_vector is not None:
+            resume_vector = self.semantic_model.embed([resume_data.get('raw_text', '')])
+            semantic_score = float(similarity_scores(resume_vector, job_vector)[0])
+        
         # Calculate overall score
         overall_score = self.calculate_overall_score(
-            skill_score, experience_score, keyword_score, education_score
+            skill_score, experience_score, keyword_score, education_score, semantic_score
         )
         
+        return self.build_match(
+            resume_data, job_requirements,
+            skill_score, experience_score, keyword_score, education_score, overall_score,
+            semantic_score
+        )
+
+    def build_match(self, resume_data, job_requirements, skill_score, experience_score,
+                    keyword_score, education_score, overall_score, semantic_score=None):
+        """Build the match record for a scored resume"""
         # Find matched and missing skills
         resume_skills_lower = [skill.lower() for skill in resume_data.get('skills', [])]
         required_skills_lower = [skill.lower() for skill in job_requirements['required_skills']]
@@ -285,7 +386,7 @@ class ResumeMatcher:
             job_requirements['experience_required']
         )
         
-        return {
+        match_result = {
             'filename': resume_data.get('filename', 'Unknown'),
             'overall_score': overall_score,
             'skill_score': round(skill_score * 100, 2),
@@ -297,31 +398,260 @@ class ResumeMatcher:
             'feedback': feedback,
             'resume_data': resume_data
         }
+        # Only reported when a semantic model is configured
+        if semantic_score is not None:
+            match_result['semantic_score'] = round(semantic_score * 100, 2)
+        return match_result
 
-    def match_resumes(self, resume_list, job_description):
-        """Match multiple resumes against job description"""
-        # Extract job requirements
-        job_requirements = self.extract_job_requirements(job_description)
+    def score_batch(self, features, job_requirements, job_vector=None):
+        """Score a whole batch of resume features with vectorized operations"""
+        weights = self.weights
+        
+        skill_scores = features.skill_scores(job_requirements['required_skills'])
+        experience_scores = features.experience_scores(job_requirements['experience_required'])
+        keyword_scores = features.keyword_scores(job_requirements['all_keywords'])
+        education_scores = features.education_scores(job_requirements['education_keywords'])
+        
+        # Same operation order as calculate_overall_score, so results are bit-identical
+        overall = (
+            skill_scores * weights['skills'] +
+            experience_scores * weights['experience'] +
+            keyword_scores * weights['keywords'] +
+            education_scores * weights['education']
+        )
         
-        results = []
+        scores = {
+            'skills': skill_scores,
+            'experience': experience_scores,
+            'keywords': keyword_scores,
+            'education': education_scores
+        }
+        if job_vector is not None:
+            scores['semantic'] = features.semantic_scores(self.semantic_model, job_vector)
+            overall = overall + scores['semantic'] * weights.get('semantic', 0.0)
+        scores['overall'] = overall
+        return scores
+
+    def score_matrix(self, features, requirements_list, job_vectors=None):
+        """Score a batch of resume features against several jobs; every array is resumes x jobs"""
+        weights = self.weights
+        
+        skill_scores = features.skill_score_matrix([requirements['required_skills']
+                                                    for requirements in requirements_list])
+        keyword_scores = features.keyword_score_matrix([requirements['all_keywords']
+                                                        for requirements in requirements_list])
+        # Experience and education are cheap per job; stack their columns
+        experience_scores = np.column_stack(
+            [features.experience_scores(requirements['experience_required'])
+             for requirements in requirements_list])
+        education_scores = np.column_stack(
+            [features.education_scores(requirements['education_keywords'])
+             for requirements in requirements_list])
+        
+        # Same operation order as score_batch, so every column matches a single-job ranking
+        overall = (
+            skill_scores * weights['skills'] +
+            experience_scores * weights['experience'] +
+            keyword_scores * weights['keywords'] +
+            education_scores * weights['education']
+        )
+        
+        scores = {
+            'skills': skill_scores,
+            'experience': experience_scores,
+            'keywords': keyword_scores,
+            'education': education_scores
+        }
+        if job_vectors is not None:
+            scores['semantic'] = features.semantic_score_matrix(self.semantic_model, job_vectors)
+            overall = overall + scores['semantic'] * weights.get('semantic', 0.0)
+        scores['overall'] = overall
+        return scores
+
+    def rank_batch(self, resume_list, job_requirements, top_k=None, job_vector=None, features=None):
+        """Score a batch and build match records for the top_k resumes, in rank order"""
+        with metrics.stage('scoring'):
+            features = features or ResumeFeatures(resume_list)
+            scores = self.score_batch(features, job_requirements, job_vector)
+        return self.rank_scores(resume_list, job_requirements, scores, top_k)
+
+    def rank_order(self, overall_scores, top_k=None):
+        """Indices of the top_k overall scores, highest first, without those below min_score"""
+        negated = -np.array(overall_scores, dtype=np.float64)
+        if top_k is None or top_k >= len(overall_scores):
+            # Sort by overall score (highest first); stable, so ties keep upload order
+            order = np.argsort(negated, kind='stable').tolist()
+        else:
+            # Partial selection: everything at least as good as the top_k-th score
+            # (in upload order), then a stable sort of just those
+            cutoff = np.partition(negated, top_k - 1)[top_k - 1]
+            candidates = np.flatnonzero(negated <= cutoff)
+            order = candidates[np.argsort(negated[candidates], kind='stable')][:top_k].tolist()
+        
+        # Scores below the cut-off sort last, so dropping them keeps the top_k correct
+        if self.min_score is not None:
+            order = [i for i in order if overall_scores[i] >= self.min_score]
+        return order
+
+    def rerank(self, filenames, components, top_k=None):
+        """Re-rank stored component scores (one row per score_store.COMPONENTS) with this matcher's weights"""
+        weights = self.weights
+        skill_scores, experience_scores, keyword_scores, education_scores, semantic_scores = components
+        if semantic_scores is None and weights.get('semantic', 0.0) > 0:
+            raise ValueError('This result was scored without a semantic model; semantic weight must be 0')
+        
+        # Same operation order as score_batch, so unchanged weights give unchanged scores
+        overall = (
+            skill_scores * weights['skills'] +
+            experience_scores * weights['experience'] +
+            keyword_scores * weights['keywords'] +
+            education_scores * weights['education']
+        )
+        if semantic_scores is not None:
+            overall = overall + semantic_scores * weights.get('semantic', 0.0)
+        overall_scores = [round(score * 100, 2) for score in overall.tolist()]
+        
+        ranking = []
+        for rank, i in enumerate(self.rank_order(overall_scores, top_k), 1):
+            entry = {
+                'rank': rank,
+                'index': i,
+                'filename': filenames[i],
+                'overall_score': overall_scores[i],
+                'skill_score': round(float(skill_scores[i]) * 100, 2),
+                'experience_score': round(float(experience_scores[i]) * 100, 2),
+                'keyword_score': round(float(keyword_scores[i]) * 100, 2),
+                'education_score': round(float(education_scores[i]) * 100, 2)
+            }
+            # Only reported when the result was scored with a semantic model
+            if semantic_scores is not None:
+                entry['semantic_score'] = round(float(semantic_scores[i]) * 100, 2)
+            ranking.append(entry)
+        return ranking
+
+    def rank_scores(self, resume_list, job_requirements, scores, top_k=None):
+        """Build match records for the top_k resumes of a scored batch; returns (order, matches)"""
+        # Python floats and round() keep the percentages identical to the per-resume path
+        overall_scores = [round(score * 100, 2) for score in scores['overall'].tolist()]
+        order = self.rank_order(overall_scores, top_k)
+        
+        # Feedback and skill lists are only built for the returned resumes
+        matches = []
+        for rank, i in enumerate(order, 1):
+            match_result = self.build_match(
+                resume_list[i], job_requirements,
+                float(scores['skills'][i]), float(scores['experience'][i]),
+                float(scores['keywords'][i]), float(scores['education'][i]),
+                overall_scores[i],
+                float(scores['semantic'][i]) if 'semantic' in scores else None
+            )
+            # Add ranking
+            match_result['rank'] = rank
+            matches.append(match_result)
+        
+        return order, matches
+
+    def match_matrix(self, resume_list, job_descriptions, top_k=None, best_jobs=BEST_FIT_JOBS):
+        """Match parsed resumes against several job descriptions in one batch"""
+        if not job_descriptions:
+            raise ValueError('At least one job description is required')
+        
+        # Requirements are extracted once per job description (and memoized)
+        requirements_list = [self.get_job_requirements(job_description)
+                             for job_description in job_descriptions]
+        
+        job_vectors = None
+        if self.uses_semantic:
+            job_vectors = np.vstack([self.get_job_vector(job_description)
+                                     for job_description in job_descriptions])
+        
+        # Resume features are built once and scored against every job together
+        with metrics.stage('scoring'):
+            scores = self.score_matrix(ResumeFeatures(resume_list), requirements_list, job_vectors)
+        
+        # Python floats and round() keep the percentages identical to match_resumes
+        overall_scores = [[round(score * 100, 2) for score in row]
+                          for row in scores['overall'].tolist()]
+        
+        jobs = []
+        for j, job_requirements in enumerate(requirements_list):
+            column = {name: values[:, j] for name, values in scores.items()}
+            order, matches = self.rank_scores(resume_list, job_requirements, column, top_k)
+            jobs.append({
+                'job_index': j,
+                'matches': matches,
+                'job_requirements': job_requirements,
+                'total_resumes': len(resume_list)
+            })
+        
+        # Best-fitting jobs per resume; ties keep job order
+        best_fit = []
+        for i, row in enumerate(overall_scores):
+            ranked = sorted(range(len(row)), key=lambda j: (-row[j], j))[:best_jobs]
+            best_fit.append({
+                'resume_index': i,
+                'filename': resume_list[i].get('filename', 'Unknown'),
+                'best_jobs': [{'job_index': j, 'overall_score': row[j]} for j in ranked]
+            })
         
-        # Match each resume
-        for resume_data in resume_list:
-            match_result = self.match_single_resume(resume_data, job_requirements)
-            results.append(match_result)
+        return {
+            'score_matrix': overall_scores,
+            'jobs': jobs,
+            'best_fit': best_fit,
+            'total_resumes': len(resume_list),
+            'total_jobs': len(job_descriptions)
+        }
+
+    def match_resumes(self, resume_list, job_description, top_k=None, keep_scores=False):
+        """Match multiple resumes against job description, optionally keeping only the top_k"""
+        # Identical ranking requests are answered from the result cache
+        # (only resumes that came through the parse cache have a cheap identity)
+        cache_key = None
+        if len(resume_list) <= RESULTS_CACHE_MAX_RESUMES:
+            fingerprints = tuple(resume_fingerprint(resume_data) for resume_data in resume_list)
+            if None not in fingerprints:
+                cache_key = (
+                    job_description_hash(job_description),
+                    fingerprints,
+                    self.config_signature(),
+                    top_k,
+                    keep_scores
+                )
+                cached = results_cache.get(cache_key)
+                if cached is not None:
+                    return dict(cached)
         
-        # Sort by overall score (highest first)
-        results.sort(key=lambda x: x['overall_score'], reverse=True)
+        # Extract job requirements
+        job_requirements = self.get_job_requirements(job_description)
+        job_vector = self.get_job_vector(job_description, keep_scores)
         
-        # Add ranking
-        for i, result in enumerate(results, 1):
-            result['rank'] = i
+        # Score the whole batch at once
+        with metrics.stage('scoring'):
+            scores = self.score_batch(ResumeFeatures(resume_list), job_requirements, job_vector)
+        order, results = self.rank_scores(resume_list, job_requirements, scores, top_k)
         
-        return {
+        ranking = {
             'matches': results,
             'job_requirements': job_requirements,
-            'total_resumes': len(results)
+            'total_resumes': len(resume_list)
         }
+        # Every resume's component scores are kept for re-ranking with other weights
+        if keep_scores:
+            filenames = [resume_data.get('filename', 'Unknown') for resume_data in resume_list]
+            ranking['result_id'] = score_store.put(filenames, scores)
+        if cache_key is not None:
+            results_cache.put(cache_key, ranking)
+        
+        return dict(ranking)
+
+def shared_matcher(weights=None, min_score=None):
+    """Process-wide matcher for a scoring configuration; matchers keep no per-request state"""
+    key = (tuple(sorted((weights or DEFAULT_WEIGHTS).items())), min_score)
+    matcher = matcher_cache.get(key)
+    if matcher is None:
+        matcher = ResumeMatcher(weights, min_score)
+        matcher_cache.put(key, matcher)
+    return matcher
 
 # Test function
 def test_matcher():
@@ -0,0 +1,314 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is not reported there
+    resource = None
+
+# METRICS_ENABLED=0 turns every hook into a no-op
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+
+# Resident memory is sampled at stage boundaries at most this often (seconds)
+RSS_SAMPLE_INTERVAL = 0.01
+
+# Latency histogram buckets in seconds (the Prometheus client defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = 'resume_stage_duration_seconds'
+REQUEST_SECONDS = 'resume_http_request_duration_seconds'
+REQUESTS = 'resume_http_requests_total'
+BYTES = 'resume_input_bytes_total'
+PAGES = 'resume_pdf_pages_total'
+PEAK_RSS = 'resume_process_peak_rss_bytes'
+ADMISSION_IN_FLIGHT = 'resume_admission_in_flight_cost'
+ADMISSION_QUEUE_DEPTH = 'resume_admission_queue_depth'
+ADMISSION_QUEUED_COST = 'resume_admission_queued_cost'
+ADMISSION_REJECTED = 'resume_admission_rejected_total'
+ADMISSION_WAIT = 'resume_admission_wait_seconds'
+
+HELP = {
+    STAGE_SECONDS: 'Time spent in each parsing and matching stage',
+    REQUEST_SECONDS: 'HTTP request latency',
+    REQUESTS: 'HTTP requests served',
+    BYTES: 'Bytes of uploaded documents processed',
+    PAGES: 'PDF pages extracted',
+    PEAK_RSS: 'Peak resident memory of the web process',
+    ADMISSION_IN_FLIGHT: 'Cost of the parse/match work currently admitted',
+    ADMISSION_QUEUE_DEPTH: 'Requests waiting for admission',
+    ADMISSION_QUEUED_COST: 'Cost of the requests waiting for admission',
+    ADMISSION_REJECTED: 'Requests turned away by admission control',
+    ADMISSION_WAIT: 'Time requests spent waiting for admission',
+}
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, or None"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _resident_rss():
+    """Current resident memory of this process in bytes, or None without /proc"""
+    try:
+        with open('/proc/self/statm', 'rb') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def current_rss():
+    """Current resident memory of this process in bytes (peak where /proc is unavailable), or None"""
+    rss = _resident_rss()
+    return rss if rss is not None else peak_rss()
+
+
+class Histogram:
+    def __init__(self):
+        """Cumulative bucket counts, sum and count of observations"""
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels, extra=None):
+    """Prometheus label set, e.g. {stage="parse_text"}"""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Registry:
+    def __init__(self):
+        """Process-wide counters, gauges and histograms keyed by name and labels"""
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+                for name in sorted({name for name, labels in metrics}):
+                    lines.append(f'# HELP {name} {HELP.get(name, name)}')
+                    lines.append(f'# TYPE {name} {kind}')
+                    for (metric, labels), value in sorted(metrics.items()):
+                        if metric == name:
+                            lines.append(f'{name}{_labels(labels)} {value}')
+
+            for name in sorted({name for name, labels in self._histograms}):
+                lines.append(f'# HELP {name} {HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        lines.append(f'{name}_bucket{_labels(labels, ("le", bound))} {count}')
+                    lines.append(f'{name}_bucket{_labels(labels, ("le", "+Inf"))} {histogram.count}')
+                    lines.append(f'{name}_sum{_labels(labels)} {histogram.sum}')
+                    lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestTimings:
+    def __init__(self):
+        """Stage timings, bytes, pages and peak memory collected for one request"""
+        self.events = []
+        self.bytes = 0
+        self.pages = 0
+        # Highest resident memory sampled while this request ran (not the process-lifetime peak)
+        self.peak_rss = None
+        self.sampled_at = float('-inf')
+
+    def sample_rss(self, now=None):
+        """Fold the current resident memory into the request's peak"""
+        rss = _resident_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+        self.sampled_at = time.perf_counter() if now is None else now
+
+    def merge(self, collected):
+        """Add timings collected elsewhere, e.g. in a pool worker"""
+        self.events.extend(collected['events'])
+        self.bytes += collected['bytes']
+        self.pages += collected['pages']
+        if collected['peak_rss']:
+            self.peak_rss = max(self.peak_rss or 0, collected['peak_rss'])
+
+    def export(self):
+        """Picklable summary for handing back from a worker process"""
+        self.sample_rss()
+        return {'events': self.events, 'bytes': self.bytes, 'pages': self.pages,
+                'peak_rss': self.peak_rss}
+
+    def totals(self):
+        """Total seconds and call count per stage, in first-seen order"""
+        totals = {}
+        for name, seconds in self.events:
+            total = totals.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+        return totals
+
+    def server_timing(self, total_seconds=None):
+        """Server-Timing header value (durations in milliseconds)"""
+        parts = [f'{name};dur={seconds * 1000:.2f};desc="{count}x"'
+                 for name, (seconds, count) in self.totals().items()]
+        if total_seconds is not None:
+            parts.append(f'total;dur={total_seconds * 1000:.2f}')
+        if self.bytes:
+            parts.append(f'bytes;desc="{self.bytes}"')
+        if self.pages:
+            parts.append(f'pages;desc="{self.pages}"')
+        self.sample_rss()
+        if self.peak_rss:
+            parts.append(f'peak_rss;desc="{self.peak_rss // (1024 * 1024)}MB"')
+        return ', '.join(parts)
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class _Stage:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        now = time.perf_counter()
+        record_stage(self.name, now - self.started)
+        timings = _current.get()
+        if timings is not None and now - timings.sampled_at >= RSS_SAMPLE_INTERVAL:
+            timings.sample_rss(now)
+        return False
+
+
+_NOOP = nullcontext()
+
+
+def stage(name):
+    """Context manager timing one stage of the current request"""
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _Stage(name)
+
+
+def record_stage(name, seconds):
+    """Add a stage duration to the current request, or straight to the registry outside one"""
+    timings = _current.get()
+    if timings is not None:
+        timings.events.append((name, seconds))
+    else:
+        registry.observe(STAGE_SECONDS, seconds, stage=name)
+
+
+def add_bytes(count):
+    """Count input document bytes"""
+    if METRICS_ENABLED:
+        timings = _current.get()
+        if timings is not None:
+            timings.bytes += count
+        else:
+            registry.inc(BYTES, count)
+
+
+def add_pages(count):
+    """Count extracted PDF pages"""
+    if METRICS_ENABLED:
+        timings = _current.get()
+        if timings is not None:
+            timings.pages += count
+        else:
+            registry.inc(PAGES, count)
+
+
+def start_collecting():
+    """Collect timings for the current request or task; returns (timings, token)"""
+    timings = RequestTimings()
+    timings.sample_rss()
+    return timings, _current.set(timings)
+
+
+def stop_collecting(token, fold=True):
+    """Stop collecting; unless fold is False, add the collected timings to the registry"""
+    timings = _current.get()
+    _current.reset(token)
+    if timings is not None and fold:
+        _fold(timings.export())
+    return timings
+
+
+def _fold(collected):
+    """Add collected timings to the registry"""
+    for name, seconds in collected['events']:
+        registry.observe(STAGE_SECONDS, seconds, stage=name)
+    if collected['bytes']:
+        registry.inc(BYTES, collected['bytes'])
+    if collected['pages']:
+        registry.inc(PAGES, collected['pages'])
+
+
+def merge(collected):
+    """Add timings exported by a worker to the current request, or to the registry"""
+    if not collected:
+        return
+    timings = _current.get()
+    if timings is not None:
+        timings.merge(collected)
+    else:
+        _fold(collected)
+
+
+def current_timings():
+    """Timings of the current request, or None"""
+    return _current.get()
+
+
+def observe_request(method, endpoint, status, seconds):
+    """Record one HTTP request's latency"""
+    registry.observe(REQUEST_SECONDS, seconds, method=method, endpoint=endpoint)
+    registry.inc(REQUESTS, method=method, endpoint=endpoint, status=status)
+    peak = peak_rss()
+    if peak:
+        registry.set_gauge(PEAK_RSS, peak)
@@ -0,0 +1,90 @@
+import json
+import math
+import os
+from functools import lru_cache
+
+from utils.matcher import DEFAULT_WEIGHTS
+from utils.semantic import get_semantic_model
+
+# Optional JSON file of named scoring profiles, e.g. one per tenant:
+# {"acme": {"weights": {"experience": 0.4, "skills": 0.3}, "min_score": 40}}
+# A profile named "default" applies to requests that do not pick one.
+SCORING_PROFILES_PATH = os.environ.get('SCORING_PROFILES_PATH', '')
+
+DEFAULT_PROFILE = 'default'
+
+
+def normalize_weights(weights):
+    """Validated weights: missing components keep their default, and the total is scaled to 1"""
+    if not isinstance(weights, dict):
+        raise ValueError('weights must be an object of component weights')
+    unknown = [name for name in weights if name not in DEFAULT_WEIGHTS]
+    if unknown:
+        raise ValueError(f"Unknown weights: {', '.join(map(str, unknown))} "
+                         f"(choose from {', '.join(DEFAULT_WEIGHTS)})")
+
+    merged = dict(DEFAULT_WEIGHTS)
+    for name, value in weights.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'Weight {name} must be a number')
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f'Weight {name} must be a non-negative number')
+        merged[name] = value
+
+    # Without a model the semantic term is dropped, which would scale every score down
+    if merged.get('semantic') and get_semantic_model() is None:
+        raise ValueError('Weight semantic needs a semantic model (set SEMANTIC_MODEL_DIR)')
+
+    total = sum(merged.values())
+    if total <= 0:
+        raise ValueError('At least one weight must be positive')
+    # Scores stay percentages; weights already summing to 1 are left exactly as given
+    if abs(total - 1) > 1e-9:
+        merged = {name: value / total for name, value in merged.items()}
+    return merged
+
+
+def scoring_options(data, base=None):
+    """Weights and min_score from a profile or request body, on top of base options"""
+    options = dict(base or {'weights': dict(DEFAULT_WEIGHTS), 'min_score': None})
+    weights = data.get('weights')
+    if isinstance(weights, str):
+        # Form fields carry the weights as a JSON object
+        try:
+            weights = json.loads(weights)
+        except ValueError:
+            raise ValueError('weights must be a JSON object of component weights')
+    if weights is not None:
+        options['weights'] = normalize_weights({**options['weights'], **weights}
+                                               if isinstance(weights, dict) else weights)
+    if data.get('min_score') not in (None, ''):
+        try:
+            options['min_score'] = float(data['min_score'])
+        except (TypeError, ValueError):
+            raise ValueError('min_score must be a number')
+    return options
+
+
+@lru_cache(maxsize=None)
+def load_profiles():
+    """Named scoring profiles from SCORING_PROFILES_PATH, validated once per process"""
+    if not SCORING_PROFILES_PATH:
+        return {}
+    try:
+        with open(SCORING_PROFILES_PATH, 'r', encoding='utf-8') as file:
+            profiles = json.load(file)
+    except (OSError, ValueError) as e:
+        raise ValueError(f'Could not load scoring profiles: {e}')
+    return {name: scoring_options(profile) for name, profile in profiles.items()}
+
+
+def resolve_profile(data, profile=None):
+    """Scoring options for a request: its profile (or the default one) plus inline weights/min_score"""
+    profiles = load_profiles()
+    name = data.get('profile') or profile
+    if name and name not in profiles:
+        raise ValueError(f'Unknown scoring profile: {name}')
+    base = profiles.get(name or DEFAULT_PROFILE)
+    return scoring_options(data, base)
@@ -0,0 +1,141 @@
+import os
+import pickle
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Optional precomputed artifact with stopwords and the compiled skill trie
+RESOURCES_ARTIFACT = os.environ.get('RESOURCES_ARTIFACT', '')
+
+ARTIFACT_VERSION = 1
+
+# Startup and lazy-load timings for this process, in seconds
+_startup_timings = {}
+_startup_lock = threading.Lock()
+
+
+def record_startup(name, seconds):
+    """Record a startup timing (first value wins)"""
+    with _startup_lock:
+        _startup_timings.setdefault(name, round(seconds, 6))
+
+
+@contextmanager
+def timed_startup(name):
+    """Time a one-off load step for the startup report"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup(name, time.perf_counter() - started)
+
+
+def startup_report():
+    """Startup timings plus which heavy libraries have been imported so far"""
+    with _startup_lock:
+        timings = dict(_startup_timings)
+    return {
+        'timings': timings,
+        'artifact': RESOURCES_ARTIFACT or None,
+        'loaded_modules': {name: name in sys.modules
+                           for name in ('nltk', 'PyPDF2', 'docx', 'numpy', 'scipy')}
+    }
+
+
+@lru_cache(maxsize=None)
+def load_artifact():
+    """Load the precomputed resources artifact once, if one is configured"""
+    if not RESOURCES_ARTIFACT:
+        return None
+    try:
+        with timed_startup('load_artifact'):
+            with open(RESOURCES_ARTIFACT, 'rb') as file:
+                artifact = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if artifact.get('version') != ARTIFACT_VERSION:
+        return None
+    return artifact
+
+
+@lru_cache(maxsize=None)
+def nltk_stopwords():
+    """NLTK English stopwords as a frozenset, or None when NLTK data is unavailable"""
+    artifact = load_artifact()
+    if artifact is not None and 'stopwords' in artifact:
+        return artifact['stopwords']
+    try:
+        with timed_startup('load_stopwords'):
+            from nltk.corpus import stopwords
+            return frozenset(stopwords.words('english'))
+    except (LookupError, ImportError, OSError):
+        return None
+
+
+def get_stopwords(fallback):
+    """Process-wide stopword set: NLTK's when available, else the given fallback"""
+    return nltk_stopwords() or fallback
+
+
+@lru_cache(maxsize=None)
+def get_word_tokenize():
+    """NLTK's word_tokenize, imported on first use"""
+    with timed_startup('import_nltk_tokenize'):
+        from nltk.tokenize import word_tokenize
+    return word_tokenize
+
+
+@lru_cache(maxsize=None)
+def get_docx_document():
+    """python-docx's Document class, imported only when a DOCX file is seen"""
+    with timed_startup('import_docx'):
+        from docx import Document
+    return Document
+
+
+def warm_up():
+    """Load every read-only scoring resource now, e.g. in a pre-fork server's master process"""
+    # Deferred imports: these modules import this one
+    from utils.extractors import get_backend
+    from utils.ingest import _get_local_parser
+    from utils.matcher import shared_matcher
+    from utils.semantic import get_semantic_model, get_vector_index
+    from utils.tokenizer import get_tokenizer
+
+    with timed_startup('warm_up'):
+        _get_local_parser()
+        shared_matcher()
+        get_tokenizer()
+        get_docx_document()
+        try:
+            get_backend()
+        except Exception:
+            # PDFs fail per file later, with the same message
+            pass
+        get_semantic_model()
+        get_vector_index()
+    return startup_report()
+
+
+def build_artifact(path):
+    """Precompute stopwords and the skill trie into a pickle for fast cold starts"""
+    from utils.skills import get_skill_matcher
+    artifact = {
+        'version': ARTIFACT_VERSION,
+        'stopwords': nltk_stopwords(),
+        'skill_matcher': get_skill_matcher()
+    }
+    with open(path, 'wb') as file:
+        pickle.dump(artifact, file, protocol=pickle.HIGHEST_PROTOCOL)
+    return artifact
+
+
+if __name__ == "__main__":
+    # Build at deploy time: python -m utils.resources resources.pickle
+    # Rebuild whenever the skill taxonomy or NLTK data changes.
+    output = sys.argv[1] if len(sys.argv) > 1 else 'resources.pickle'
+    artifact = build_artifact(output)
+    print(f"Wrote {output}: {len(artifact['skill_matcher'].skills)} skills, "
+          f"{len(artifact['stopwords'] or ())} stopwords")
@@ -1,157 +1,311 @@
 import re
+import io
 import os
-import PyPDF2
-from docx import Document
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.tag import pos_tag
 import string
+import sys
+from utils import metrics
+from utils.skills import get_skill_matcher
+from utils.extractors import iter_docx_paragraphs, iter_pdf_pages
+from utils.resources import get_docx_document, get_stopwords
+from utils.tokenizer import get_tokenizer
 
-class ResumeParser:
-    def __init__(self):
-        """Initialize the resume parser with required NLTK components"""
-        try:
-            self.stop_words = set(stopwords.words('english'))
-        except LookupError:
-            # If stopwords not downloaded, use basic English stopwords
-            self.stop_words = set(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 
+# Bump whenever parse_text output changes, to invalidate cached parse results
+PARSER_VERSION = '8'
+
+def as_stream(source):
+    """Wrap bytes in an in-memory buffer; paths and file-like objects pass through"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+def document_size(source):
+    """Size in bytes of a path, bytes or seekable file-like object; 0 when unknown"""
+    try:
+        if isinstance(source, str):
+            return os.path.getsize(source)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return len(source)
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END) - position
+        source.seek(position)
+        return size
+    except (OSError, AttributeError, ValueError):
+        return 0
+
+# Basic English stopwords, used when NLTK data is not downloaded
+FALLBACK_STOP_WORDS = frozenset(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 
                                  'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 
                                  'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 
                                  'itself', 'they', 'them', 'their', 'theirs', 'themselves'])
+
+# Precompiled field patterns, shared by every parser instance
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', re.IGNORECASE)
+
+# Phone formats in priority order: the first format found anywhere in the text wins
+PHONE_PATTERNS = (
+    re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'),
+    re.compile(r'\(\d{3}\)\s*\d{3}[-.]?\d{4}'),
+    re.compile(r'\+\d{1,3}[-.\s]?\d{3,4}[-.\s]?\d{3,4}[-.\s]?\d{3,4}'),
+)
+
+# Experience indicators, factored into one pattern: "5+ years of experience",
+# "5 yrs experience", "experience of 5 years", "5 years in", "5 years working".
+# The trailing "experience" is only looked at, so "experience 5 years" may
+# start on it.
+EXPERIENCE_PATTERN = re.compile(r'''
+    (\d+)[\+\s]*(?:years?\s+(?:(?:of\s+)?(?=experience)|in\s+|working)
+                 |yrs?\s+(?:of\s+)?(?=experience))
+  | experience\s+(?:of\s+)?(\d+)[\+\s]*years?
+''', re.VERBOSE)
+
+EDUCATION_KEYWORDS = ('bachelor', 'master', 'phd', 'degree', 'university', 'college',
+                      'diploma', 'certification', 'b.sc', 'm.sc', 'b.tech', 'm.tech',
+                      'mba', 'graduate', 'undergraduate')
+
+# Section headings on a line of their own, optionally followed by ':' and content
+SECTION_PATTERN = re.compile(r'''^[ \t]*(?:
+      (?P<experience>(?:(?:work|professional|employment)[ \t]+)?(?:experience|history)|employment)
+    | (?P<education>education(?:al[ \t]+background)?|academic[ \t]+(?:background|qualifications)
+                    |qualifications)
+    | (?P<skills>(?:(?:technical|core|key)[ \t]+)?skills|technologies|competencies)
+    )[ \t]*(?::[^\n]*)?$''', re.IGNORECASE | re.MULTILINE | re.VERBOSE)
+
+SECTIONS = ('contact', 'experience', 'education', 'skills')
+
+def split_sections(text):
+    """Split resume text into sections in one pass; text before the first heading is 'contact'"""
+    sections = {name: [] for name in SECTIONS}
+    name, start = 'contact', 0
+    for match in SECTION_PATTERN.finditer(text):
+        sections[name].append(text[start:match.start()])
+        name, start = match.lastgroup, match.start()
+    sections[name].append(text[start:])
+    return {name: ''.join(parts) for name, parts in sections.items()}
+
+# Fields of a parsed resume, in output order
+RESUME_FIELDS = ('filename', 'raw_text', 'email', 'phone', 'skills', 'education',
+                 'experience_years', 'keywords')
+
+# Resume fields echoed in API responses unless a request asks for others
+DEFAULT_RESPONSE_FIELDS = ('email', 'phone', 'skills', 'experience_years')
+
+class ParsedResume:
+    """Compact parse result; reads like the dict it replaces (get, [], keys)"""
+    # content_key is the parse-cache key of the source document, not a field
+    __slots__ = RESUME_FIELDS + ('content_key',)
+
+    def __init__(self, raw_text='', email=None, phone=None, skills=(), education=(),
+                 experience_years=0, keywords=(), filename=None, content_key=None):
+        self.content_key = content_key
+        self.filename = filename
+        self.raw_text = raw_text
+        self.email = email
+        self.phone = phone
+        # Skill names repeat across every resume, so share one string per skill
+        self.skills = [sys.intern(skill) for skill in skills]
+        self.education = list(education)
+        self.experience_years = experience_years
+        self.keywords = list(keywords)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a parse result dict (cache, corpus index or caller input)"""
+        return cls(**{name: data[name] for name in RESUME_FIELDS if name in data})
+
+    def __reduce__(self):
+        # Positional state pickles smaller than a slot dict when sent back from workers
+        return (ParsedResume, (self.raw_text, self.email, self.phone, self.skills, self.education,
+                               self.experience_years, self.keywords, self.filename))
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None) if name in RESUME_FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, name):
+        if name not in RESUME_FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        if name not in RESUME_FIELDS:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        # Every field is a key, like the parse result dict, even when its value is None
+        return name in RESUME_FIELDS
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def keys(self):
+        return RESUME_FIELDS
+
+    def copy(self):
+        """Shallow copy, so callers can set the filename without touching a cached record"""
+        return ParsedResume(self.raw_text, self.email, self.phone, self.skills, self.education,
+                            self.experience_years, self.keywords, self.filename, self.content_key)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in RESUME_FIELDS}
+
+def response_fields(fields=None, include_raw_text=None):
+    """Resume fields for a response: the defaults, or a validated selection; 'all' selects every field"""
+    if fields is None:
+        fields = list(DEFAULT_RESPONSE_FIELDS)
+    else:
+        if isinstance(fields, str):
+            fields = [name.strip() for name in fields.split(',') if name.strip()]
+        elif not isinstance(fields, (list, tuple)):
+            raise ValueError("fields must be a list or a comma-separated string")
+        fields = list(fields)
+        if fields == ['all']:
+            fields = [name for name in RESUME_FIELDS if name != 'filename']
+        unknown = [name for name in fields if name not in RESUME_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown resume fields: {', '.join(map(str, unknown))} "
+                             f"(choose from {', '.join(RESUME_FIELDS)})")
+    if include_raw_text and 'raw_text' not in fields:
+        fields.append('raw_text')
+    elif include_raw_text is False and 'raw_text' in fields:
+        fields.remove('raw_text')
+    return tuple(fields)
+
+class ResumeParser:
+    def __init__(self):
+        """Initialize the resume parser from process-wide shared resources"""
+        # Stopwords are loaded once per process (NLTK data, artifact or fallback)
+        self.stop_words = get_stopwords(FALLBACK_STOP_WORDS)
         
-        # Common skills keywords (you can expand this)
-        self.tech_skills = {
-            'programming': ['python', 'java', 'javascript', 'c++', 'c#', 'php', 'ruby', 'go', 
-                          'rust', 'swift', 'kotlin', 'scala', 'r', 'matlab', 'sql', 'html', 
-                          'css', 'typescript'],
-            'frameworks': ['react', 'angular', 'vue', 'django', 'flask', 'spring', 'express', 
-                         'nodejs', 'laravel', 'rails', 'bootstrap', 'jquery'],
-            'databases': ['mysql', 'postgresql', 'mongodb', 'redis', 'sqlite', 'oracle', 
-                        'cassandra', 'elasticsearch'],
-            'cloud': ['aws', 'azure', 'gcp', 'docker', 'kubernetes', 'terraform', 'jenkins'],
-            'tools': ['git', 'github', 'gitlab', 'jira', 'slack', 'trello', 'figma', 'photoshop']
-        }
+        # Skill taxonomy, matched in a single pass by a shared token trie
+        self.skill_matcher = get_skill_matcher()
+        self.tech_skills = self.skill_matcher.categories
         
         # Experience indicators
-        self.experience_patterns = [
-            r'(\d+)[\+\s]*years?\s+(?:of\s+)?experience',
-            r'(\d+)[\+\s]*yrs?\s+(?:of\s+)?experience',
-            r'experience\s+(?:of\s+)?(\d+)[\+\s]*years?',
-            r'(\d+)[\+\s]*years?\s+in\s+',
-            r'(\d+)[\+\s]*years?\s+working',
-        ]
-
-    def extract_text_from_pdf(self, file_path):
-        """Extract text from PDF file"""
+        self.experience_pattern = EXPERIENCE_PATTERN
+
+    def extract_text_from_pdf(self, source):
+        """Extract text from PDF file (path, file-like object or bytes)"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            # Pages are streamed from the configured backend, stopping at the page/char caps
+            pages = [page + "\n" for page in iter_pdf_pages(source)]
+            metrics.add_pages(len(pages))
+            return "".join(pages)
         except Exception as e:
             raise Exception(f"Error reading PDF: {str(e)}")
 
-    def extract_text_from_docx(self, file_path):
-        """Extract text from DOCX file"""
+    def extract_text_from_docx(self, source):
+        """Extract text from DOCX file (path, file-like object or bytes)"""
+        stream = as_stream(source)
+        position = stream.tell() if hasattr(stream, 'tell') else None
         try:
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
+            # Paragraphs and table cells are streamed out of word/document.xml
+            return "".join(paragraph + "\n" for paragraph in iter_docx_paragraphs(stream))
+        except Exception:
+            # Malformed files get a second chance with python-docx
+            if position is not None:
+                stream.seek(position)
+        
+        try:
+            # python-docx is only imported once a DOCX file needs it
+            Document = get_docx_document()
+            doc = Document(stream)
+            return "".join(paragraph.text + "\n" for paragraph in doc.paragraphs)
         except Exception as e:
             raise Exception(f"Error reading DOCX: {str(e)}")
 
-    def extract_text_from_txt(self, file_path):
-        """Extract text from TXT file"""
+    def extract_text_from_txt(self, source):
+        """Extract text from TXT file (path, file-like object or bytes)"""
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                return file.read()
+            if isinstance(source, str):
+                with open(source, 'r', encoding='utf-8', errors='ignore') as file:
+                    return file.read()
+            
+            data = as_stream(source).read()
+            if isinstance(data, str):
+                return data
+            # Same result as reading the file in text mode (universal newlines)
+            text = data.decode('utf-8', errors='ignore')
+            return text.replace('\r\n', '\n').replace('\r', '\n')
         except Exception as e:
             raise Exception(f"Error reading TXT: {str(e)}")
 
-    def extract_text(self, file_path):
-        """Extract text based on file extension"""
-        ext = os.path.splitext(file_path)[1].lower()
+    def extract_text(self, source, filename=None):
+        """Extract text based on file extension; source is a path, file-like object or bytes"""
+        name = filename or (source if isinstance(source, str) else getattr(source, 'name', ''))
+        ext = os.path.splitext(str(name))[1].lower()
+        if metrics.METRICS_ENABLED:
+            metrics.add_bytes(document_size(source))
         
-        if ext == '.pdf':
-            return self.extract_text_from_pdf(file_path)
-        elif ext == '.docx':
-            return self.extract_text_from_docx(file_path)
-        elif ext == '.txt':
-            return self.extract_text_from_txt(file_path)
-        else:
-            raise Exception(f"Unsupported file format: {ext}")
+        with metrics.stage('extract_text'):
+            if ext == '.pdf':
+                return self.extract_text_from_pdf(source)
+            elif ext == '.docx':
+                return self.extract_text_from_docx(source)
+            elif ext == '.txt':
+                return self.extract_text_from_txt(source)
+            else:
+                raise Exception(f"Unsupported file format: {ext}")
 
     def extract_email(self, text):
         """Extract email addresses from text"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text, re.IGNORECASE)
-        return emails[0] if emails else None
+        email = EMAIL_PATTERN.search(text)
+        return email.group() if email else None
 
     def extract_phone(self, text):
         """Extract phone numbers from text"""
-        phone_patterns = [
-            r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
-            r'\(\d{3}\)\s*\d{3}[-.]?\d{4}',
-            r'\+\d{1,3}[-.\s]?\d{3,4}[-.\s]?\d{3,4}[-.\s]?\d{3,4}'
-        ]
-        
-        for pattern in phone_patterns:
-            phones = re.findall(pattern, text)
-            if phones:
-                return phones[0]
+        for pattern in PHONE_PATTERNS:
+            phone = pattern.search(text)
+            if phone:
+                return phone.group()
         return None
 
     def extract_skills(self, text):
         """Extract technical skills from text"""
-        text_lower = text.lower()
-        found_skills = []
-        
-        for category, skills in self.tech_skills.items():
-            for skill in skills:
-                # Use word boundaries to avoid partial matches
-                pattern = r'\b' + re.escape(skill) + r'\b'
-                if re.search(pattern, text_lower):
-                    found_skills.append(skill)
-        
-        return list(set(found_skills))  # Remove duplicates
+        return self.skill_matcher.find_all(text)
 
     def extract_education(self, text):
         """Extract education information"""
-        education_keywords = ['bachelor', 'master', 'phd', 'degree', 'university', 'college', 
-                            'diploma', 'certification', 'b.sc', 'm.sc', 'b.tech', 'm.tech', 
-                            'mba', 'graduate', 'undergraduate']
-        
-        lines = text.split('\n')
-        education_info = []
+        text_lower = text.lower()
+        if len(text_lower) != len(text):
+            # Lowercasing changed offsets; test line by line instead
+            lines = [line.strip() for line in text.split('\n')
+                     if any(keyword in line.lower() for keyword in EDUCATION_KEYWORDS)]
+            return lines[:3]
         
-        for line in lines:
-            line_lower = line.lower()
-            if any(keyword in line_lower for keyword in education_keywords):
-                education_info.append(line.strip())
+        # Line starts of the first few lines containing each keyword; the first
+        # 3 matching lines overall are among them
+        line_starts = set()
+        for keyword in EDUCATION_KEYWORDS:
+            found = []
+            position = text_lower.find(keyword)
+            while position != -1 and len(found) < 3:
+                start = text_lower.rfind('\n', 0, position) + 1
+                found.append(start)
+                end = text_lower.find('\n', position)
+                if end == -1:
+                    break
+                position = text_lower.find(keyword, end)
+            line_starts.update(found)
         
-        return education_info[:3]  # Return first 3 education entries
+        education_info = []
+        for start in sorted(line_starts)[:3]:  # Return first 3 education entries
+            end = text.find('\n', start)
+            education_info.append(text[start:end if end != -1 else len(text)].strip())
+        return education_info
 
     def extract_experience_years(self, text):
         """Extract years of experience from text"""
-        text_lower = text.lower()
-        years = []
-        
-        for pattern in self.experience_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            years.extend([int(match) for match in matches])
-        
+        years = [int(leading or trailing)
+                 for leading, trailing in self.experience_pattern.findall(text.lower())]
         return max(years) if years else 0
 
     def extract_keywords(self, text):
         """Extract important keywords from text"""
         try:
-            # Tokenize and remove stopwords
-            tokens = word_tokenize(text.lower())
+            # Tokenize (built-in regex tokenizer unless TOKENIZER=nltk) and remove stopwords
+            tokenize = get_tokenizer()
+            tokens = tokenize(text.lower())
             tokens = [token for token in tokens if token not in self.stop_words 
                      and token not in string.punctuation and len(token) > 2]
             
@@ -163,7 +317,7 @@ class ResumeParser:
             # Return top keywords
             sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
             return [word for word, freq in sorted_words[:20]]
-        except:
+        except Exception:
             # Fallback if NLTK components not available
             words = text.lower().split()
             words = [word.strip(string.punctuation) for word in words if len(word) > 2]
@@ -171,21 +325,32 @@ class ResumeParser:
 
     def parse_text(self, text):
         """Parse resume text and extract structured information"""
-        return {
-            'raw_text': text,
-            'email': self.extract_email(text),
-            'phone': self.extract_phone(text),
-            'skills': self.extract_skills(text),
-            'education': self.extract_education(text),
-            'experience_years': self.extract_experience_years(text),
-            'keywords': self.extract_keywords(text)
-        }
-
-    def parse_resume(self, file_path):
-        """Parse resume file and extract structured information"""
+        sections = split_sections(text)
+        contact = sections['contact']
+        
+        # Contact fields and education are looked up in their own sections first;
+        # skills, experience and keywords also occur in summaries, so they use
+        # the whole text
+        with metrics.stage('parse_fields'):
+            education = self.extract_education(sections['education']) if sections['education'] else []
+            email = self.extract_email(contact) or self.extract_email(text)
+            phone = self.extract_phone(contact) or self.extract_phone(text)
+            education = education or self.extract_education(text)
+            experience_years = self.extract_experience_years(text)
+        
+        with metrics.stage('skills'):
+            skills = self.extract_skills(text)
+        
+        with metrics.stage('keywords'):
+            keywords = self.extract_keywords(text)
+        
+        return ParsedResume(text, email, phone, skills, education, experience_years, keywords)
+
+    def parse_resume(self, source, filename=None):
+        """Parse resume file (path, file-like object or bytes) and extract structured information"""
         try:
             # Extract text from file
-            text = self.extract_text(file_path)
+            text = self.extract_text(source, filename)
             
             if not text or len(text.strip()) < 50:
                 raise Exception("File appears to be empty or has insufficient content")
@@ -0,0 +1,85 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import numpy as np
+
+# Component scores of ranked results, kept so they can be re-ranked with other weights
+SCORE_STORE_PATH = os.environ.get('SCORE_STORE_PATH', '/tmp/resume_scores/scores.sqlite3')
+SCORE_STORE_TTL = int(os.environ.get('SCORE_STORE_TTL', '86400'))
+
+# Expired results are purged every this many writes
+_PURGE_INTERVAL = 64
+
+# Row order of the stored component matrix; semantic is only stored when it was computed
+COMPONENTS = ('skills', 'experience', 'keywords', 'education', 'semantic')
+
+
+class ScoreStore:
+    def __init__(self, path=SCORE_STORE_PATH, ttl=SCORE_STORE_TTL):
+        """Component score vectors per result id, in SQLite so every worker process sees them"""
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._schema_ready = False
+        self._writes = 0
+
+    def _connect(self):
+        """Per-thread connection, creating the schema on first use"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30)
+            if not self._schema_ready:
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('CREATE TABLE IF NOT EXISTS scores (id TEXT PRIMARY KEY, '
+                           'filenames TEXT NOT NULL, components BLOB NOT NULL, expires REAL NOT NULL)')
+                db.commit()
+                self._schema_ready = True
+            self._local.db = db
+        return db
+
+    def put(self, filenames, scores):
+        """Store the component score arrays of a ranking; returns its result id"""
+        result_id = uuid.uuid4().hex
+        # Rankings scored without a semantic model store one row fewer
+        components = np.vstack([np.asarray(scores[name], dtype=np.float64)
+                                for name in COMPONENTS if name in scores])
+        db = self._connect()
+        with db:
+            db.execute('INSERT INTO scores (id, filenames, components, expires) VALUES (?, ?, ?, ?)',
+                       (result_id, json.dumps(list(filenames)), components.tobytes(),
+                        time.time() + self.ttl))
+            self._writes += 1
+            if self._writes % _PURGE_INTERVAL == 0:
+                db.execute('DELETE FROM scores WHERE expires < ?', (time.time(),))
+        return result_id
+
+    def get(self, result_id):
+        """(filenames, components) for a stored result, components being one row per COMPONENTS
+        (the semantic row None when it was not computed); or None"""
+        row = self._connect().execute('SELECT filenames, components FROM scores WHERE id = ? AND expires >= ?',
+                                      (result_id, time.time())).fetchone()
+        if row is None:
+            return None
+        filenames = json.loads(row[0])
+        components = np.frombuffer(row[1], dtype=np.float64)
+        # Rows stored with another set of components cannot be re-ranked
+        if not filenames or components.size % len(filenames):
+            return None
+        rows = components.size // len(filenames)
+        if rows not in (len(COMPONENTS) - 1, len(COMPONENTS)):
+            return None
+        components = list(components.reshape(rows, len(filenames)))
+        if rows < len(COMPONENTS):
+            components.append(None)
+        return filenames, components
+
+
+# Process-wide score store
+score_store = ScoreStore()
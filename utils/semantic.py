@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from utils import metrics
+from utils.cache import LRUCache
+from utils.resources import timed_startup
+
+# Optional offline semantic model: a directory built with python -m utils.semantic
+SEMANTIC_MODEL_DIR = os.environ.get('SEMANTIC_MODEL_DIR', '')
+
+# Size of the latent space when training
+SEMANTIC_DIMENSIONS = int(os.environ.get('SEMANTIC_DIMENSIONS', '128'))
+
+# Corpus resumes pulled into a search by vector similarity alone
+SEMANTIC_CANDIDATES = int(os.environ.get('SEMANTIC_CANDIDATES', '200'))
+
+MODEL_VERSION = 1
+
+# Files of a model directory
+MODEL_FILE = 'model.pickle'
+COMPONENTS_FILE = 'components.npy'
+VECTORS_FILE = 'vectors.npy'
+DOC_IDS_FILE = 'doc_ids.npy'
+
+# Job description vectors, memoized per model
+job_vector_cache = LRUCache(int(os.environ.get('JOB_VECTOR_CACHE_SIZE', '256')))
+
+
+class SemanticModel:
+    def __init__(self, vectorizer, components, fingerprint):
+        """TF-IDF vectorizer plus truncated SVD projection into a small latent space"""
+        self.vectorizer = vectorizer
+        self.components = components
+        self.fingerprint = fingerprint
+        self.dimensions = components.shape[0]
+
+    def embed(self, texts):
+        """Unit-length float32 vectors of the given texts, one row per text"""
+        if not len(texts):
+            # The vectorizer rejects empty batches, e.g. an empty corpus at build time
+            return np.empty((0, self.dimensions), dtype=np.float32)
+        with metrics.stage('semantic'):
+            tfidf = self.vectorizer.transform([text or '' for text in texts])
+            vectors = np.asarray(tfidf @ self.components.T, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            # Texts without any known term stay zero and score 0
+            np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def job_vector(self, job_description):
+        """Vector of a job description, memoized on the text and model"""
+        key = (hashlib.sha256(job_description.encode('utf-8', errors='surrogatepass')).hexdigest(),
+               self.fingerprint)
+        vector = job_vector_cache.get(key)
+        if vector is None:
+            vector = self.embed([job_description])[0]
+            job_vector_cache.put(key, vector)
+        return vector
+
+
+def similarity_scores(vectors, job_vectors):
+    """Cosine similarities as float64 scores in [0, 1] (negative similarity scores 0)"""
+    return np.clip(np.asarray(vectors @ job_vectors.T, dtype=np.float64), 0.0, 1.0)
+
+
+class VectorIndex:
+    def __init__(self, doc_ids, vectors):
+        """Precomputed corpus vectors (memory-mapped, float32) with their sorted document ids"""
+        self.doc_ids = doc_ids
+        self.vectors = vectors
+
+    def top_k(self, job_vector, k):
+        """(doc_ids, scores) of the k most similar corpus resumes, best first"""
+        if not len(self.doc_ids) or k <= 0:
+            return [], []
+        scores = self.vectors @ job_vector
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        order = order[scores[order] > 0]
+        return self.doc_ids[order].tolist(), scores[order].tolist()
+
+    def lookup(self, doc_ids):
+        """Stored vectors of the given documents; rows are None where a document has none"""
+        if not len(self.doc_ids):
+            return [None] * len(doc_ids)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.doc_ids, doc_ids), len(self.doc_ids) - 1)
+        found = self.doc_ids[positions] == doc_ids
+        return [self.vectors[position] if hit else None for position, hit in zip(positions, found)]
+
+
+@lru_cache(maxsize=None)
+def get_semantic_model():
+    """The configured semantic model, loaded once per process; None when not configured"""
+    if not SEMANTIC_MODEL_DIR:
+        return None
+    try:
+        with timed_startup('load_semantic_model'):
+            with open(os.path.join(SEMANTIC_MODEL_DIR, MODEL_FILE), 'rb') as file:
+                model = pickle.load(file)
+            components = np.load(os.path.join(SEMANTIC_MODEL_DIR, COMPONENTS_FILE), mmap_mode='r')
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        return None
+    if model.get('version') != MODEL_VERSION:
+        return None
+    return SemanticModel(model['vectorizer'], components, model['fingerprint'])
+
+
+@lru_cache(maxsize=None)
+def get_vector_index():
+    """Memory-mapped corpus vectors of the configured model, or None"""
+    if get_semantic_model() is None:
+        return None
+    try:
+        with timed_startup('load_vector_index'):
+            doc_ids = np.load(os.path.join(SEMANTIC_MODEL_DIR, DOC_IDS_FILE))
+            vectors = np.load(os.path.join(SEMANTIC_MODEL_DIR, VECTORS_FILE), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    return VectorIndex(doc_ids, vectors)
+
+
+def semantic_fingerprint():
+    """Fingerprint of the configured model for cache keys ('' without one)"""
+    model = get_semantic_model()
+    return model.fingerprint if model is not None else ''
+
+
+def train_model(texts, dimensions=SEMANTIC_DIMENSIONS):
+    """Fit TF-IDF and truncated SVD on resume and job texts"""
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(sublinear_tf=True, stop_words='english', min_df=2, max_df=0.95,
+                                 max_features=50000, dtype=np.float32)
+    tfidf = vectorizer.fit_transform(texts)
+    # Only needed for introspection; dropping it keeps the pickle small
+    vectorizer.stop_words_ = None
+
+    dimensions = min(dimensions, tfidf.shape[1] - 1, len(texts) - 1)
+    if dimensions < 1:
+        raise ValueError('Not enough texts to train a semantic model')
+    svd = TruncatedSVD(n_components=dimensions, random_state=0)
+    svd.fit(tfidf)
+    components = np.ascontiguousarray(svd.components_, dtype=np.float32)
+
+    fingerprint = hashlib.sha1(components.tobytes()).hexdigest()[:16]
+    return SemanticModel(vectorizer, components, fingerprint)
+
+
+def build_model(directory, texts=(), dimensions=SEMANTIC_DIMENSIONS):
+    """Train on the corpus index (plus extra texts) and precompute every corpus resume's vector"""
+    from utils.corpus_index import corpus_index
+
+    documents = corpus_index.documents()
+    model = train_model([data.get('raw_text', '') for doc_id, data in documents] + list(texts),
+                        dimensions)
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, MODEL_FILE), 'wb') as file:
+        pickle.dump({'version': MODEL_VERSION, 'vectorizer': model.vectorizer,
+                     'fingerprint': model.fingerprint}, file, protocol=pickle.HIGHEST_PROTOCOL)
+    np.save(os.path.join(directory, COMPONENTS_FILE), model.components)
+
+    # Vectors are stored in doc_id order so lookups can binary-search the ids
+    vectors = model.embed([data.get('raw_text', '') for doc_id, data in documents])
+    np.save(os.path.join(directory, DOC_IDS_FILE),
+            np.array([doc_id for doc_id, data in documents], dtype=np.int64))
+    np.save(os.path.join(directory, VECTORS_FILE), vectors)
+    return model, len(documents)
+
+
+if __name__ == "__main__":
+    # Build offline: python -m utils.semantic MODEL_DIR [extra training .txt files]
+    # Rebuild after large corpus changes; resumes added later are embedded at search time.
+    output = sys.argv[1] if len(sys.argv) > 1 else 'semantic_model'
+    extra_texts = []
+    for path in sys.argv[2:]:
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            extra_texts.append(file.read())
+    model, count = build_model(output, extra_texts)
+    print(json.dumps({'directory': output, 'dimensions': model.dimensions,
+                      'vocabulary': len(model.vectorizer.vocabulary_), 'corpus_vectors': count,
+                      'fingerprint': model.fingerprint}))
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+
+# Default skill taxonomy shipped with the app; override with SKILL_TAXONOMY_PATH
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     'data', 'skills.json')
+
+# Alphanumeric runs are words, every other non-space character is its own token
+TOKEN_PATTERN = re.compile(r'[^\W_]+|\S')
+
+# Marks the end of a complete skill inside the trie; tokens are never empty, and a
+# plain string keeps the trie picklable for the precomputed resources artifact
+_END = ''
+
+
+def tokenize_with_spacing(text):
+    """Split text into tokens, flagging tokens that follow whitespace"""
+    tokens = []
+    spaced = []
+    prev_end = -1
+    for match in TOKEN_PATTERN.finditer(text):
+        tokens.append(match.group())
+        spaced.append(match.start() != prev_end)
+        prev_end = match.end()
+    return tokens, spaced
+
+
+class SkillMatcher:
+    def __init__(self, taxonomy):
+        """Build a token trie over every skill in the taxonomy"""
+        self.categories = {}
+        self.skills = []
+        self._trie = {}
+
+        seen = set()
+        for category, skills in taxonomy.items():
+            self.categories[category] = []
+            for skill in skills:
+                skill = skill.strip().lower()
+                if not skill:
+                    continue
+                self.categories[category].append(skill)
+                if skill not in seen:
+                    seen.add(skill)
+                    self.skills.append(skill)
+                    self._add(skill)
+
+        # Identifies this taxonomy, so cached parse results can be invalidated
+        self.fingerprint = hashlib.sha1('\n'.join(self.skills).encode('utf-8')).hexdigest()[:12]
+
+    def _add(self, skill):
+        """Insert a skill into the trie, keyed token by token"""
+        tokens, spaced = tokenize_with_spacing(skill)
+        node = self._trie
+        for i, token in enumerate(tokens):
+            # Tokens that were separated by whitespace in the skill must be
+            # separated by whitespace in the text as well ("machine learning"
+            # vs "c++"), so the separator is part of the key
+            key = ' ' + token if i and spaced[i] else token
+            node = node.setdefault(key, {})
+        node[_END] = skill
+
+    def find_all(self, text):
+        """Return every skill found in text, in order of first occurrence"""
+        if not text:
+            return []
+
+        tokens, spaced = tokenize_with_spacing(text.lower())
+        trie = self._trie
+        n = len(tokens)
+        found = {}
+
+        # Skills only start and end on token boundaries, so walking the trie
+        # from each token gives word-boundary matches in one pass
+        for i in range(n):
+            node = trie.get(tokens[i])
+            j = i
+            while node is not None:
+                skill = node.get(_END)
+                if skill is not None and skill not in found:
+                    found[skill] = i
+                j += 1
+                if j == n:
+                    break
+                node = node.get(' ' + tokens[j] if spaced[j] else tokens[j])
+
+        return list(found)
+
+
+def load_taxonomy(path=None):
+    """Load a {category: [skills]} taxonomy from a JSON file"""
+    path = path or os.environ.get('SKILL_TAXONOMY_PATH') or DEFAULT_TAXONOMY_PATH
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            taxonomy = json.load(file)
+    except Exception as e:
+        raise Exception(f"Error loading skill taxonomy: {str(e)}")
+
+    if isinstance(taxonomy, list):
+        # A flat list of skills is accepted as a single category
+        taxonomy = {'skills': taxonomy}
+    return taxonomy
+
+
+@lru_cache(maxsize=None)
+def get_skill_matcher(path=None):
+    """Return the process-wide skill matcher, built once per taxonomy file"""
+    if path is None and not os.environ.get('SKILL_TAXONOMY_PATH'):
+        # A precomputed artifact skips parsing the taxonomy and building the trie
+        from utils.resources import load_artifact
+        artifact = load_artifact()
+        if artifact is not None and 'skill_matcher' in artifact:
+            return artifact['skill_matcher']
+
+    from utils.resources import timed_startup
+    with timed_startup('build_skill_matcher'):
+        return SkillMatcher(load_taxonomy(path))
@@ -0,0 +1,62 @@
+import json
+
+from utils.ingest import iter_parse_texts
+from utils.matcher import project_match
+
+# Media type for newline-delimited JSON responses
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_stream(request, data):
+    """True when an /api/analyze request asks for a streamed NDJSON response"""
+    if str(request.args.get('stream', '')).lower() in ('1', 'true', 'ndjson'):
+        return True
+    if data.get('stream') is True:
+        return True
+    return NDJSON_MIMETYPE in request.headers.get('Accept', '')
+
+
+def iter_analysis_records(resumes_text, job_description, matcher, top_k=None, fields=None):
+    """Parse and score resumes one at a time, yielding a record for each as it is ready"""
+    job_requirements = matcher.get_job_requirements(job_description)
+    job_vector = matcher.get_job_vector(job_description)
+
+    # Only compact scores are kept for the final ranking; parsed resumes are
+    # dropped as soon as they are scored
+    scored = []
+    errors = []
+    for i, (parsed_data, error) in enumerate(iter_parse_texts(resumes_text)):
+        filename = f'Resume_{i+1}'
+        if error:
+            errors.append({'filename': filename, 'error': error})
+            yield {'type': 'error', 'index': i, 'filename': filename, 'error': error}
+            continue
+
+        parsed_data['filename'] = filename
+        match_result = project_match(matcher.match_single_resume(parsed_data, job_requirements, job_vector),
+                                     fields)
+        scored.append((-match_result['overall_score'], i, filename))
+
+        match_result['type'] = 'score'
+        match_result['index'] = i
+        yield match_result
+
+    # Same order as the full stable sort: score descending, then input position
+    scored.sort()
+    if top_k is not None:
+        scored = scored[:top_k]
+
+    yield {
+        'type': 'ranking',
+        'ranking': [{'rank': rank, 'index': i, 'filename': filename, 'overall_score': -score}
+                    for rank, (score, i, filename) in enumerate(scored, 1)],
+        'job_requirements': job_requirements,
+        'total_resumes': len(resumes_text) - len(errors),
+        'errors': errors
+    }
+
+
+def iter_ndjson(records):
+    """Serialize records as newline-delimited JSON"""
+    for record in records:
+        yield json.dumps(record) + '\n'
@@ -0,0 +1,67 @@
+import os
+import re
+
+from utils.resources import get_word_tokenize
+
+# Word tokenizer for keywords: 'regex' (built-in, fast) or 'nltk' (word_tokenize)
+TOKENIZER = os.environ.get('TOKENIZER', 'regex')
+
+# Lookahead for a word end where NLTK splits off a clitic: a space, a
+# separator or the end of the text (but not a line break)
+_CLITIC_END = r"""(?=[ ;@#$%&?!*()\[\]{}<>"`«»“”‘’„]|--|[:,](?!\d)|\.(?:\.|[\])}>"'»”’]*(?:\s|$))|$)"""
+
+# One pass over the text reproducing NLTK's word_tokenize splits: separators
+# become their own tokens, while hyphens, internal periods (node.js, 3.5) and
+# digit separators (10,000, 12:30) stay inside words. A period that ends a
+# sentence is split off; like Punkt, a number followed by a lowercase word
+# does not end one. Clitics are split as in "do n't", "we 'll", "resume 's",
+# and, like NLTK's STARTING_QUOTES, an opening single quote is split off the
+# word it starts ("'Python'" gives ' Python ').
+TOKEN_PATTERN = re.compile(r"""
+    ``?|''                                          # quotes
+  | (?<!\w)'(?=\w)(?!(?:re|ve|ll|m|t|s|d|n)\b)     # opening single quotes
+  | \.{2,}                                          # ellipses
+  | --                                              # double dashes
+  | (?<![^\s("`{\[:;&#*@)}\]\-,])-?[.,]?\d[\d,.:\-]*\.(?=\s+(?:[^\W\d_]|[;:,]|[.!?](?!\S)))  # numbers keeping their period
+  | (?:n't|'(?:[smd]|ll|re|ve)?)CLITIC_END          # clitics
+  | (?:[^\s;@#$%&?!*()\[\]{}<>"`:,.\-«»“”‘’„'n]     # word characters
+     | n(?!'tCLITIC_END)
+     | '(?!'|(?:[smd]|ll|re|ve)?CLITIC_END)          # apostrophes inside words
+     | -(?!-)                                       # single hyphens
+     | [:,](?=\d)                                   # digit separators
+     | \.(?![\s.]|$)(?!(?=[?!)";}\]*:@'({\[])[^.?!\s]*(?:\s|$))  # periods not ending a sentence
+    )+
+  | \S                                              # any other punctuation
+""".replace('CLITIC_END', _CLITIC_END), re.VERBOSE | re.IGNORECASE)
+
+# Contractions NLTK splits inside a word, with the split position
+CONTRACTIONS = {
+    'cannot': 3, 'gimme': 3, 'gonna': 3, 'gotta': 3, 'lemme': 3, 'wanna': 3,
+    "d'ye": 1, "more'n": 4
+}
+CONTRACTION_PATTERN = re.compile(r"\b(?:cannot|gimme|gonna|gotta|lemme|wanna|d'ye|more'n)\b", re.IGNORECASE)
+
+
+def regex_tokenize(text):
+    """Tokenize text like NLTK's word_tokenize, using a single compiled regex"""
+    tokens = TOKEN_PATTERN.findall(text)
+    if CONTRACTION_PATTERN.search(text):
+        split_tokens = []
+        for token in tokens:
+            split = CONTRACTIONS.get(token.lower())
+            if split:
+                split_tokens.extend((token[:split], token[split:]))
+            else:
+                split_tokens.append(token)
+        tokens = split_tokens
+    return tokens
+
+
+def get_tokenizer(name=None):
+    """Return the configured word tokenizer function"""
+    name = name or TOKENIZER
+    if name == 'regex':
+        return regex_tokenize
+    if name == 'nltk':
+        return get_word_tokenize()
+    raise ValueError(f"Unknown tokenizer: {name}")